@@ -11,6 +11,29 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.agent_controller import DataAnalysisAgent
 
+SALES_PATH = "examples/sample_datasets/sales_data.csv"
+CUSTOMER_PATH = "examples/sample_datasets/customer_data.csv"
+
+SALES_TASK = """
+        Perform a comprehensive sales analysis:
+        1. Show sales trends over time
+        2. Compare performance across regions
+        3. Analyze product performance
+        4. Identify any patterns or anomalies
+        5. Create relevant visualizations
+        """
+
+CUSTOMER_TASK = """
+        Analyze customer demographics and behavior:
+        1. Show age and income distributions
+        2. Analyze satisfaction scores by membership level
+        3. Identify correlations between variables
+        4. Compare purchase frequency patterns
+        5. Create segmentation visualizations
+        """
+
+CUSTOM_QUERY_TASK = "Show me which product generates the most revenue and create a visualization"
+
 
 def example_1_sales_analysis():
     """Example 1: Comprehensive sales data analysis."""
@@ -25,18 +48,7 @@ def example_1_sales_analysis():
     )
 
     # Run analysis
-    csv_path = "examples/sample_datasets/sales_data.csv"
-    result = agent.analyze(
-        csv_path=csv_path,
-        task="""
-        Perform a comprehensive sales analysis:
-        1. Show sales trends over time
-        2. Compare performance across regions
-        3. Analyze product performance
-        4. Identify any patterns or anomalies
-        5. Create relevant visualizations
-        """
-    )
+    result = agent.analyze(csv_path=SALES_PATH, task=SALES_TASK)
 
     print("\n" + "=" * 60)
     print("Analysis complete!")
@@ -54,18 +66,7 @@ def example_2_customer_analysis():
         verbosity_level=1
     )
 
-    csv_path = "examples/sample_datasets/customer_data.csv"
-    result = agent.analyze(
-        csv_path=csv_path,
-        task="""
-        Analyze customer demographics and behavior:
-        1. Show age and income distributions
-        2. Analyze satisfaction scores by membership level
-        3. Identify correlations between variables
-        4. Compare purchase frequency patterns
-        5. Create segmentation visualizations
-        """
-    )
+    result = agent.analyze(csv_path=CUSTOMER_PATH, task=CUSTOMER_TASK)
 
     print("\n" + "=" * 60)
     print("Analysis complete!")
@@ -83,11 +84,7 @@ def example_3_custom_query():
         verbosity_level=1
     )
 
-    csv_path = "examples/sample_datasets/sales_data.csv"
-    result = agent.analyze(
-        csv_path=csv_path,
-        task="Show me which product generates the most revenue and create a visualization"
-    )
+    result = agent.analyze(csv_path=SALES_PATH, task=CUSTOM_QUERY_TASK)
 
     print("\n" + "=" * 60)
     print("Analysis complete!")
@@ -134,10 +131,15 @@ if __name__ == "__main__":
     elif args.example == 4:
         example_4_interactive_mode()
     else:
-        # Run all examples (except interactive)
+        # Run all examples (except interactive), batching tasks that share a file.
+        # Batches run one after another: the generated plotting code uses
+        # matplotlib's process-global pyplot state, and agents share one console
         print("Running all examples...\n")
-        example_1_sales_analysis()
-        example_2_customer_analysis()
-        example_3_custom_query()
+        agent = DataAnalysisAgent(
+            model_name="gemini/gemini-2.5-flash",
+            verbosity_level=1
+        )
+        agent.analyze_batch(SALES_PATH, [SALES_TASK, CUSTOM_QUERY_TASK])
+        agent.analyze_batch(CUSTOMER_PATH, [CUSTOMER_TASK])
         print("\n\nAll examples complete!")
         print("To try interactive mode, run: python examples/example_usage.py --example 4")
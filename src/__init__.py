@@ -0,0 +1,10 @@
+"""
+Polars analyst agent package.
+
+Polars sizes its thread pool once, when it is first imported, so the
+defaults are pinned here before any submodule imports it.
+"""
+import os
+
+os.environ.setdefault("POLARS_MAX_THREADS", str(os.cpu_count() or 4))
+os.environ.setdefault("POLARS_FMT_MAX_COLS", "-1")
@@ -1,22 +1,94 @@
 """
 Agent Controller: Main orchestration of the data analysis agent.
+
+Heavy dependencies (smolagents/litellm, polars, rich) are imported when the
+agent is constructed, so importing this module and `--help` stay fast.
 """
+import asyncio
+import logging
 import os
+import re
+import threading
 import time
-from typing import Optional, Dict, Any
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+import importlib.resources
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Dict, Any, List
 
-from smolagents import CodeAgent, LiteLLMModel, PythonInterpreterTool, tool
-from smolagents.agents import PromptTemplates
+from dotenv import load_dotenv
 
-from src.tools.data_loader import PolarsDataLoaderTool
-from src.tools.data_inspector import DataInspectorTool
-from src.tools.data_profiler import DataProfilerTool
-from src.tools.data_validator import DataValidatorTool
-from src.prompts.system_prompts import DATA_ANALYSIS_TASK_TEMPLATE, AGENT_SYSTEM_PROMPT
-from src.formatters.result_formatter import ResultFormatter
+from src.prompts.system_prompts import (
+    DATA_ANALYSIS_TASK_TEMPLATE,
+    AGENT_SYSTEM_PROMPT,
+    AGENT_SYSTEM_PROMPT_SHA,
+    BATCH_TASK_TEMPLATE,
+    system_blocks,
+)
 from src.execution.authorized_imports import AUTHORIZED_IMPORTS
-from src.memory import get_compact_memory_callbacks
+from src.memory import get_compact_memory_callbacks, ResponseCache
+
+if TYPE_CHECKING:
+    from smolagents.agents import PromptTemplates
+
+_log = logging.getLogger("polars_agent.agent")
+_log.addHandler(logging.NullHandler())
+
+# Read .env once per process rather than on every agent construction
+_ENV_LOADED = load_dotenv()
+
+# Beyond a handful of tasks per prompt the answers get long and less reliable
+MAX_BATCH_TASKS = 5
+
+_QUIT_COMMANDS = frozenset({"quit", "exit", "q"})
+
+_TASK_HEADER = re.compile(r"^#+\s*Task\s+(\d+)\b.*$", re.MULTILINE)
+
+
+@lru_cache(maxsize=1)
+def _default_prompt_templates() -> "PromptTemplates":
+    """Load smolagents' default CodeAgent prompt templates once per process."""
+    import yaml
+
+    return yaml.safe_load(
+        importlib.resources.files("smolagents.prompts").joinpath("code_agent.yaml").read_text()
+    )
+
+
+def _build_prompt_templates() -> "PromptTemplates":
+    """Default templates with our custom system prompt swapped in."""
+    prompt_templates = dict(_default_prompt_templates())
+    prompt_templates['system_prompt'] = AGENT_SYSTEM_PROMPT
+    return prompt_templates
+
+
+def _split_batch_answer(answer: str, n_tasks: int) -> List[str]:
+    """Split a batched answer on its '## Task <n>' headers, one entry per task."""
+    headers = list(_TASK_HEADER.finditer(answer))
+    if not headers:
+        # Model ignored the format (or the run failed) - every task gets the full text
+        return [answer] * n_tasks
+
+    sections: Dict[int, str] = {}
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(answer)
+        sections[int(match.group(1))] = answer[match.end():end].strip()
+    return [sections.get(i, "") for i in range(1, n_tasks + 1)]
+
+
+def _is_checked_answer(step: Any) -> bool:
+    """
+    Tell whether a run ended with a final_answer() call that passed the checks.
+
+    After max_steps the agent still yields a final answer, written by the model
+    without calling final_answer(), so check_final_answer never saw it.
+    """
+    from smolagents.utils import AgentMaxStepsError
+
+    return (
+        step is not None
+        and bool(getattr(step, "is_final_answer", False))
+        and not isinstance(getattr(step, "error", None), AgentMaxStepsError)
+    )
 
 
 class DataAnalysisAgent:
@@ -27,6 +99,7 @@ class DataAnalysisAgent:
     1. Load CSV with Polars
     2. Inspect data structure
     3. Profile data characteristics
+       (steps 1-3 run locally and are sent to the model as one context block)
     4. Generate tailored analysis code
     5. Execute and validate code
     6. Present results
@@ -37,7 +110,9 @@ class DataAnalysisAgent:
         model_name: str = "gemini/gemini-2.5-flash",
         api_key: Optional[str] = None,
         max_steps: int = 12,
-        verbosity_level: int = 1
+        verbosity_level: int = 1,
+        use_cache: bool = True,
+        env_path: Optional[str] = None
     ):
         """
         Initialize the data analysis agent.
@@ -47,9 +122,23 @@ class DataAnalysisAgent:
             api_key: Gemini API key (reads from GEMINI_API_KEY env var if not provided)
             max_steps: Maximum agentic steps before stopping
             verbosity_level: 0=silent, 1=normal, 2=verbose
+            use_cache: Reuse answers for identical (file, task, model) runs
+            env_path: Extra .env file to load, overriding existing variables
         """
-        # Load environment variables
-        load_dotenv()
+        from smolagents import CodeAgent
+
+        from src.models import PromptCachingLiteLLMModel
+
+        from src.tools.data_loader import PolarsDataLoaderTool
+        from src.tools.data_inspector import DataInspectorTool
+        from src.tools.data_profiler import DataProfilerTool
+        from src.tools.data_validator import DataValidatorTool
+        from src.tools.final_answer_schema import check_final_answer
+        from src.formatters.result_formatter import ResultFormatter
+
+        # Per-instance .env overrides the one loaded at import
+        if env_path:
+            load_dotenv(env_path, override=True)
 
         # Set API key
         if api_key:
@@ -59,16 +148,24 @@ class DataAnalysisAgent:
                 "GEMINI_API_KEY not found. Either pass api_key parameter or set GEMINI_API_KEY environment variable."
             )
 
-        # Initialize LiteLLM model
-        self.model = LiteLLMModel(
+        # A different hash than the previous run means its prompt cache can't be reused
+        _log.debug("System prompt sha256=%s", AGENT_SYSTEM_PROMPT_SHA[:16])
+
+        # Initialize LiteLLM model; the static system prompt is sent cache-marked
+        self.model = PromptCachingLiteLLMModel(
             model_id=model_name,
-            api_key=os.getenv("GEMINI_API_KEY")
+            api_key=os.getenv("GEMINI_API_KEY"),
+            system_blocks=system_blocks()
         )
 
-        # Store agent parameters for reuse during retries
+        # Store agent parameters
         self.max_steps = max_steps
         self.verbosity_level = verbosity_level
 
+        # Stream large files in bounded chunks (POLARS_MAX_THREADS is pinned
+        # in src/__init__.py, before Polars is first imported)
+        os.environ.setdefault("POLARS_STREAMING_CHUNK_SIZE", "50000")
+
         # Initialize tools (without PythonInterpreterTool - CodeAgent creates it)
         self.tools = [
             PolarsDataLoaderTool(),
@@ -77,33 +174,27 @@ class DataAnalysisAgent:
             DataValidatorTool(),  # Validates data quality and provides code recommendations
         ]
 
-        # Initialize agent with authorized imports and custom system prompt
-        # First create agent with defaults to get default prompt templates
-        temp_agent = CodeAgent(
-            tools=self.tools,
-            model=self.model,
-            max_steps=max_steps,
-            verbosity_level=verbosity_level,
-            additional_authorized_imports=AUTHORIZED_IMPORTS
-        )
-        # Get default templates and override system_prompt
-        prompt_templates = temp_agent.prompt_templates.copy()
-        prompt_templates['system_prompt'] = AGENT_SYSTEM_PROMPT
-
-        # Recreate agent with custom system prompt and memory optimization
+        # Initialize agent with custom system prompt and memory optimization
         self.agent = CodeAgent(
             tools=self.tools,
             model=self.model,
-            prompt_templates=prompt_templates,
+            prompt_templates=_build_prompt_templates(),
             max_steps=max_steps,
             verbosity_level=verbosity_level,
             additional_authorized_imports=AUTHORIZED_IMPORTS,
-            step_callbacks=get_compact_memory_callbacks()
+            step_callbacks=get_compact_memory_callbacks(),
+            final_answer_checks=[check_final_answer]
         )
 
         # Initialize formatter
         self.formatter = ResultFormatter()
 
+        # Cache of final answers keyed by file fingerprint, task, model and system prompt
+        self.cache = ResponseCache() if use_cache else None
+
+        # A CodeAgent holds one conversation at a time; serializes analyze() callers
+        self._run_lock = threading.Lock()
+
     def analyze(
         self,
         csv_path: str,
@@ -114,6 +205,9 @@ class DataAnalysisAgent:
         """
         Run data analysis on a CSV file with retry logic for API overload.
 
+        Calls on the same instance are serialized, from any thread or
+        through analyze_async, because the CodeAgent keeps one conversation.
+
         Args:
             csv_path: Path to the CSV file to analyze
             task: Description of the analysis task
@@ -123,16 +217,36 @@ class DataAnalysisAgent:
         Returns:
             Analysis results as a string
         """
+        with self._run_lock:
+            return self._analyze(csv_path, task, max_retries, retry_delay)
+
+    def _analyze(self, csv_path: str, task: str, max_retries: int, retry_delay: float) -> str:
+        from smolagents.memory import ActionStep, FinalAnswerStep
+
         # Validate file exists
         if not os.path.exists(csv_path):
             error_msg = f"File not found: {csv_path}"
             self.formatter.print_error(error_msg)
             return error_msg
 
-        # Format the task
+        # Serve repeated analyses of an unchanged file from the cache
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key(csv_path, task, self.model.model_id)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.formatter.print_step(
+                    "Using Cached Result",
+                    f"File: {csv_path}\nTask: {task}"
+                )
+                self.formatter.format_agent_result(cached)
+                return cached
+
+        # Run the deterministic discovery tools locally, then format the task
         full_task = DATA_ANALYSIS_TASK_TEMPLATE.format(
             csv_path=csv_path,
-            task_description=task
+            task_description=task,
+            data_context=self._prepare_context(csv_path)
         )
 
         # Print start message
@@ -144,8 +258,19 @@ class DataAnalysisAgent:
         # Retry loop for handling API overload
         for attempt in range(max_retries + 1):
             try:
-                # Run the agent
-                result = self.agent.run(full_task)
+                # Run the agent, reporting each step as it completes
+                result = None
+                last_step = None
+                for step in self.agent.run(full_task, stream=True):
+                    if isinstance(step, FinalAnswerStep):
+                        result = step.output
+                    elif isinstance(step, ActionStep):
+                        last_step = step
+                        self.formatter.print_agent_step(step)
+
+                # Only answers that passed check_final_answer are reused
+                if cache_key is not None and result is not None and _is_checked_answer(last_step):
+                    self.cache.set(cache_key, result)
 
                 # Format and display result
                 self.formatter.format_agent_result(result)
@@ -169,27 +294,98 @@ class DataAnalysisAgent:
                         f"Waiting {wait_time:.1f}s before retry...[/yellow]"
                     )
                     time.sleep(wait_time)
-                    # Reset agent for next attempt with custom system prompt and memory optimization
-                    prompt_templates = self.agent.prompt_templates.copy()
-                    prompt_templates['system_prompt'] = AGENT_SYSTEM_PROMPT
-                    self.agent = CodeAgent(
-                        tools=self.tools,
-                        model=self.model,
-                        prompt_templates=prompt_templates,
-                        max_steps=self.max_steps,
-                        verbosity_level=self.verbosity_level,
-                        additional_authorized_imports=AUTHORIZED_IMPORTS,
-                        step_callbacks=get_compact_memory_callbacks()
-                    )
+                    # The next run(reset=True) clears the failed attempt's memory and monitor
                 else:
                     error_msg = f"Analysis failed: {str(e)}"
                     self.formatter.print_error(error_msg)
                     return error_msg
 
+    async def analyze_async(
+        self,
+        csv_path: str,
+        task: str = "Perform comprehensive exploratory data analysis",
+        max_retries: int = 3,
+        retry_delay: float = 4.0
+    ) -> str:
+        """
+        Async variant of analyze() that runs the agent in a worker thread.
+
+        Like analyze(), calls on the same instance wait for each other, so
+        gathered calls run one at a time. Separate instances in one process
+        share matplotlib's global pyplot state, so run concurrent analyses
+        that plot in separate processes.
+
+        Args:
+            csv_path: Path to the CSV file to analyze
+            task: Description of the analysis task
+            max_retries: Maximum number of retries on 503 errors
+            retry_delay: Base delay in seconds between retries
+
+        Returns:
+            Analysis results as a string
+        """
+        return await asyncio.to_thread(self.analyze, csv_path, task, max_retries, retry_delay)
+
+    def analyze_batch(
+        self,
+        csv_path: str,
+        tasks: List[str],
+        max_retries: int = 3,
+        retry_delay: float = 4.0
+    ) -> List[str]:
+        """
+        Run several analysis tasks on one CSV file with a single agent run per batch.
+
+        Tasks are sent together (at most MAX_BATCH_TASKS per prompt) and the
+        answer is split back into one result per task.
+
+        Args:
+            csv_path: Path to the CSV file to analyze
+            tasks: Descriptions of the analysis tasks
+            max_retries: Maximum number of retries on 503 errors
+            retry_delay: Base delay in seconds between retries
+
+        Returns:
+            One result string per task, in the same order as tasks
+        """
+        results = []
+        for start in range(0, len(tasks), MAX_BATCH_TASKS):
+            batch = tasks[start:start + MAX_BATCH_TASKS]
+            numbered = "\n\n".join(
+                f"## Task {i}\n{task.strip()}" for i, task in enumerate(batch, 1)
+            )
+            combined_task = BATCH_TASK_TEMPLATE.format(n_tasks=len(batch), tasks=numbered)
+            answer = self.analyze(csv_path, combined_task, max_retries, retry_delay)
+            results.extend(_split_batch_answer(str(answer), len(batch)))
+        return results
+
+    def _prepare_context(self, csv_path: str) -> str:
+        """
+        Run the loader, inspector, profiler and validator tools without the LLM.
+
+        Their reports are handed to the model in a single prompt so it can go
+        straight to writing analysis code instead of spending a round-trip per tool.
+
+        Args:
+            csv_path: Path to the CSV file to analyze
+
+        Returns:
+            Concatenated tool reports, one labeled section per tool
+        """
+        # The tools are independent and Polars releases the GIL, so run them concurrently
+        with ThreadPoolExecutor(max_workers=len(self.tools)) as executor:
+            reports = list(executor.map(lambda data_tool: data_tool.forward(csv_path), self.tools))
+
+        return "\n\n".join(
+            f"[{data_tool.name}]\n{report}" for data_tool, report in zip(self.tools, reports)
+        )
+
     def analyze_interactive(self):
         """
         Interactive CLI mode for analyzing multiple files.
         """
+        from rich.panel import Panel
+
         self.formatter.console.print(
             Panel(
                 "[bold cyan]Data Analysis Agent[/bold cyan]\n"
@@ -208,16 +404,12 @@ class DataAnalysisAgent:
                 if not user_input:
                     continue
 
-                if user_input.lower() in ["quit", "exit", "q"]:
+                if user_input.lower() in _QUIT_COMMANDS:
                     self.formatter.console.print("[yellow]Goodbye![/yellow]")
                     break
 
                 if user_input.startswith("analyze "):
-                    csv_path = user_input[8:].strip()
-                    if csv_path.startswith('"') and csv_path.endswith('"'):
-                        csv_path = csv_path[1:-1]
-                    elif csv_path.startswith("'") and csv_path.endswith("'"):
-                        csv_path = csv_path[1:-1]
+                    csv_path = user_input[8:].strip().strip('"').strip("'")
 
                     self.analyze(csv_path)
                 else:
@@ -264,6 +456,11 @@ def main():
         action="store_true",
         help="Enable verbose output"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the model and rerun the data tools, ignoring cached results"
+    )
     parser.add_argument(
         "--interactive",
         action="store_true",
@@ -272,11 +469,22 @@ def main():
 
     args = parser.parse_args()
 
+    if args.no_cache:
+        # Also bypass the memoized data tool reports
+        from src.tools._csv_cache import NO_CACHE_ENV
+        os.environ[NO_CACHE_ENV] = "1"
+
+    if args.verbose:
+        # Surface internal diagnostics such as observation truncation
+        logging.basicConfig(format="[%(name)s] %(message)s")
+        logging.getLogger("polars_agent").setLevel(logging.DEBUG)
+
     # Initialize agent
     agent = DataAnalysisAgent(
         model_name=args.model,
         max_steps=args.max_steps,
-        verbosity_level=2 if args.verbose else 1
+        verbosity_level=2 if args.verbose else 1,
+        use_cache=not args.no_cache
     )
 
     # Run analysis
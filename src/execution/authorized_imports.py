@@ -2,7 +2,8 @@
 Authorized imports for safe code execution.
 """
 
-AUTHORIZED_IMPORTS = [
+# Ordered for readability; smolagents builds its own lookup set from this.
+AUTHORIZED_IMPORTS = (
     "polars",
     "numpy",
     "matplotlib",
@@ -19,4 +20,4 @@ AUTHORIZED_IMPORTS = [
     "statistics",
     "datetime",
     "re",
-]
+)
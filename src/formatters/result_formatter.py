@@ -1,11 +1,58 @@
 """
 Result formatting utilities.
 """
+from functools import singledispatch
 from rich.console import Console
 from rich.panel import Panel
 from rich.syntax import Syntax
 from rich.markdown import Markdown
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Tuple
+
+
+def _print_code(value: str, console: Console) -> None:
+    console.print("\n[bold cyan]Generated Code:[/bold cyan]")
+    console.print(Syntax(value, "python", theme="monokai", line_numbers=True))
+
+
+def _print_visualizations(value: list, console: Console) -> None:
+    console.print("\n[bold cyan]Visualizations:[/bold cyan]")
+    for viz in value:
+        console.print(f"  📊 {viz}")
+
+
+def _print_insights(value: list, console: Console) -> None:
+    console.print("\n[bold cyan]Insights:[/bold cyan]")
+    for insight in value:
+        console.print(f"  • {insight}")
+
+
+# Special-cased dict keys: key -> (expected value type, handler)
+_KEY_HANDLERS: Dict[str, Tuple[type, Callable[[Any, Console], None]]] = {
+    "code": (str, _print_code),
+    "visualizations": (list, _print_visualizations),
+    "insights": (list, _print_insights),
+    "key_findings": (list, _print_insights),
+}
+
+
+@singledispatch
+def _render_result(result: Any, console: Console) -> None:
+    console.print(str(result))
+
+
+@_render_result.register
+def _(result: str, console: Console) -> None:
+    console.print(result)
+
+
+@_render_result.register
+def _(result: dict, console: Console) -> None:
+    for key, value in result.items():
+        expected_type, handler = _KEY_HANDLERS.get(key, (None, None))
+        if handler is not None and isinstance(value, expected_type):
+            handler(value, console)
+        else:
+            console.print(f"\n[bold]{key}:[/bold] {value}")
 
 
 class ResultFormatter:
@@ -22,30 +69,27 @@ class ResultFormatter:
             border_style="green"
         ))
 
-        if isinstance(result, str):
-            self.console.print(result)
-        elif isinstance(result, dict):
-            self._format_dict_result(result)
-        else:
-            self.console.print(str(result))
+        _render_result(result, self.console)
 
     def _format_dict_result(self, result: Dict[str, Any]) -> None:
         """Format dictionary results."""
-        for key, value in result.items():
-            if key == "code" and isinstance(value, str):
-                self.console.print("\n[bold cyan]Generated Code:[/bold cyan]")
-                syntax = Syntax(value, "python", theme="monokai", line_numbers=True)
-                self.console.print(syntax)
-            elif key == "visualizations" and isinstance(value, list):
-                self.console.print("\n[bold cyan]Visualizations:[/bold cyan]")
-                for viz in value:
-                    self.console.print(f"  📊 {viz}")
-            elif key == "insights" and isinstance(value, list):
-                self.console.print("\n[bold cyan]Insights:[/bold cyan]")
-                for insight in value:
-                    self.console.print(f"  • {insight}")
-            else:
-                self.console.print(f"\n[bold]{key}:[/bold] {value}")
+        _render_result(result, self.console)
+
+    def print_agent_step(self, step: Any) -> None:
+        """Print a one-line summary of an agent step as soon as it completes."""
+        status = "[red]error[/red]" if getattr(step, "error", None) else "[green]ok[/green]"
+        timing = getattr(step, "timing", None)
+        duration = getattr(timing, "duration", None)
+        elapsed = f" ({duration:.1f}s)" if duration is not None else ""
+        self.console.print(f"  [dim]Step {getattr(step, 'step_number', '?')}[/dim] {status}{elapsed}")
+
+        observations = getattr(step, "observations", None)
+        if observations:
+            # Skip smolagents' "Execution logs:" header to show the first real output line
+            lines = [line for line in str(observations).splitlines()
+                     if line.strip() and line.strip() != "Execution logs:"]
+            if lines:
+                self.console.print(f"    {lines[0]}", style="dim", overflow="ellipsis", no_wrap=True, markup=False)
 
     def print_step(self, step_name: str, description: str = "") -> None:
         """Print a workflow step."""
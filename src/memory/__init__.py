@@ -1,4 +1,5 @@
 """Memory management utilities for token optimization."""
 from .compact_memory import register_compact_memory, get_compact_memory_callbacks
+from .response_cache import ResponseCache
 
-__all__ = ['register_compact_memory', 'get_compact_memory_callbacks']
+__all__ = ['register_compact_memory', 'get_compact_memory_callbacks', 'ResponseCache']
@@ -4,10 +4,64 @@ Memory compaction callback for token usage optimization.
 This module provides a callback system that truncates tool observations
 after each agent step to reduce token accumulation in the conversation history.
 """
-from typing import Any
+import importlib.util
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Optional
 
+# Silent unless the application configures logging, e.g.
+# logging.getLogger("polars_agent").setLevel(logging.DEBUG)
+_log = logging.getLogger("polars_agent.memory")
+_log.addHandler(logging.NullHandler())
 
-def truncate_text(text: str, max_chars: int, suffix: str = "... [truncated]") -> str:
+# Observation budgets (tokens); errors keep more context for debugging
+MAX_OBSERVATION_TOKENS = 250
+MAX_ERROR_OBSERVATION_TOKENS = 400
+
+# Rough characters-per-token ratio used when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+
+_DEFAULT_SUFFIX = "... [truncated]"
+
+
+def _litellm_tokenizer_dir() -> Optional[str]:
+    """Return litellm's bundled tiktoken cache dir, without importing litellm."""
+    spec = importlib.util.find_spec("litellm")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    path = os.path.join(spec.submodule_search_locations[0], "litellm_core_utils", "tokenizers")
+    return path if os.path.isdir(path) else None
+
+
+@lru_cache(maxsize=1)
+def _get_encoder() -> Any:
+    """
+    Load the cl100k_base tokenizer once, or return None if it is unavailable.
+
+    tiktoken downloads encodings on first use, so unless TIKTOKEN_CACHE_DIR is
+    already set it is pointed at the copy bundled with litellm, which works
+    offline. Without tiktoken or an encoding file, token counts fall back to
+    _CHARS_PER_TOKEN characters per token.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        _log.debug("tiktoken not installed; estimating %d chars per token", _CHARS_PER_TOKEN)
+        return None
+
+    bundled = _litellm_tokenizer_dir()
+    if bundled is not None:
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", bundled)
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except OSError as e:
+        # No cached encoding and no network (requests errors are OSErrors)
+        _log.debug("cl100k_base unavailable (%s); estimating %d chars per token", e, _CHARS_PER_TOKEN)
+        return None
+
+
+def truncate_text(text: str, max_chars: int, suffix: str = _DEFAULT_SUFFIX) -> str:
     """
     Truncate text to a maximum character count.
 
@@ -21,40 +75,98 @@ def truncate_text(text: str, max_chars: int, suffix: str = "... [truncated]") ->
     """
     if len(text) <= max_chars:
         return text
+    if max_chars <= len(suffix):
+        # No room for any text; a cut-down suffix still marks the truncation
+        return suffix[:max_chars]
 
     return text[:max_chars - len(suffix)] + suffix
 
 
-def compact_memory_callback(step: Any, **kwargs) -> None:
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text, estimating from its length if no tokenizer is available.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Number of tokens
+    """
+    encoder = _get_encoder()
+    if encoder is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, suffix: str = _DEFAULT_SUFFIX) -> str:
+    """
+    Truncate text to a maximum token count.
+
+    Args:
+        text: The text to truncate
+        max_tokens: Maximum number of tokens to keep, suffix included
+        suffix: Suffix to append when truncated
+
+    Returns:
+        Truncated text with suffix if necessary
+    """
+    # A token is never shorter than one byte, so short text skips tokenizing
+    if len(text.encode("utf-8")) <= max_tokens:
+        return text
+
+    encoder = _get_encoder()
+    if encoder is None:
+        return truncate_text(text, max_tokens * _CHARS_PER_TOKEN, suffix)
+
+    tokens = encoder.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+
+    suffix_tokens = encoder.encode(suffix, disallowed_special=())
+    if max_tokens <= len(suffix_tokens):
+        return encoder.decode(suffix_tokens[:max_tokens])
+    return encoder.decode(tokens[:max_tokens - len(suffix_tokens)]) + suffix
+
+
+def compact_memory_callback(step: Any, **kwargs: Any) -> None:
     """
     Callback that truncates observations after each agent step.
 
     This callback is called after each action step and reduces the size of
-    tool observations to prevent excessive token usage. Errors are preserved
-    with a higher character limit for debugging purposes.
+    tool observations to prevent excessive token usage. Limits are measured in
+    tokens, so dense numeric output and prose get the same budget. Errors are
+    preserved with a higher token limit for debugging purposes.
 
     Args:
         step: ActionStep object from smolagents
         **kwargs: Additional arguments (agent, etc.) passed by smolagents
     """
+    debug = _log.isEnabledFor(logging.DEBUG)
+
     if not hasattr(step, 'observations'):
-        print(f"[MemoryCompact] Step has no 'observations' attribute (type: {type(step).__name__})")
+        if debug:
+            _log.debug("Step has no 'observations' attribute (type: %s)", type(step).__name__)
+        return
+
+    observations = step.observations
+    if not observations:
+        if debug:
+            _log.debug("Step %s has empty observations", getattr(step, 'step_number', '?'))
+        return
+
+    text = observations if isinstance(observations, str) else str(observations)
+    is_error = bool(getattr(step, 'error', None))
+    # Preserve errors with higher limit for debugging
+    limit = MAX_ERROR_OBSERVATION_TOKENS if is_error else MAX_OBSERVATION_TOKENS
+    truncated = truncate_tokens(text, max_tokens=limit)
+    if truncated is text:
         return
 
-    if step.observations:
-        original_len = len(str(step.observations))
-        # Preserve errors with higher limit for debugging
-        if hasattr(step, 'error') and step.error:
-            step.observations = truncate_text(str(step.observations), max_chars=1200)
-            print(f"[MemoryCompact] Truncated error observation: {original_len} → {len(step.observations)} chars")
-        else:
-            # Normal observations get aggressive truncation
-            step.observations = truncate_text(str(step.observations), max_chars=800)
-            new_len = len(step.observations)
-            if original_len > new_len:
-                print(f"[MemoryCompact] Truncated observation: {original_len} → {new_len} chars")
-    else:
-        print(f"[MemoryCompact] Step {getattr(step, 'step_number', '?')} has empty observations")
+    step.observations = truncated
+    # Only build the diagnostics when someone is listening
+    if debug:
+        kind = "error observation" if is_error else "observation"
+        _log.debug("Truncated %s: %d -> %d chars (max %d tokens)", kind, len(text), len(truncated), limit)
 
 
 def get_compact_memory_callbacks() -> list:
@@ -100,8 +212,8 @@ def register_compact_memory(agent: Any) -> None:
 
     # Try to register callback with the CallbackRegistry
     try:
-        from smolagents.agents import ActionStep
+        from smolagents.agents import ActionStep  # type: ignore[import-untyped]
         agent.step_callbacks.register(ActionStep, compact_memory_callback)
-        print(f"[Memory Optimization] Registered compaction callback (max 800 chars/observation)")
+        print(f"[Memory Optimization] Registered compaction callback (max {MAX_OBSERVATION_TOKENS} tokens/observation)")
     except Exception as e:
         print(f"[Memory Optimization] Warning: Could not register callback: {e}")
@@ -0,0 +1,99 @@
+"""
+Response cache for repeated analyses.
+
+Final agent answers are cached in memory and on disk, keyed by the CSV file's
+fingerprint (path, mtime, size), the task text, the model identifier, the
+system prompt hash and the cache format version, so re-running the same
+analysis on an unchanged file skips the LLM entirely.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+from src.prompts.system_prompts import AGENT_SYSTEM_PROMPT_SHA
+
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "polars-analyst-agent")
+
+# Bump when the FinalAnswer contract or the data tool reports change, so
+# answers produced under the old ones are no longer served
+CACHE_FORMAT_VERSION = 1
+
+
+def _visualizations(value: Any) -> list:
+    """Return the plot files listed by a final answer (a dict or its JSON text)."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    if not isinstance(value, dict):
+        return []
+    files = value.get("visualizations")
+    return [f for f in files if isinstance(f, str)] if isinstance(files, list) else []
+
+
+class ResponseCache:
+    """Two-level (memory + JSON files) cache of final agent answers."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self._memory: Dict[str, Any] = {}
+
+    @staticmethod
+    def make_key(csv_path: str, task: str, model_id: str) -> str:
+        """
+        Build a cache key that changes whenever the file, task, model, system
+        prompt or cache format changes.
+
+        Args:
+            csv_path: Path to the analyzed CSV file
+            task: Full task text sent to the agent
+            model_id: LiteLLM model identifier
+
+        Returns:
+            Hex digest identifying this analysis
+        """
+        stat = os.stat(csv_path)
+        raw = (
+            f"{CACHE_FORMAT_VERSION}:{AGENT_SYSTEM_PROMPT_SHA}:"
+            f"{os.path.abspath(csv_path)}:{stat.st_mtime_ns}:{stat.st_size}:{task}:{model_id}"
+        )
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached answer for key, or None on a miss.
+
+        An answer whose listed visualization files no longer exist counts as
+        a miss, so the analysis is rerun and the plots are saved again.
+        """
+        if key in self._memory:
+            value = self._memory[key]
+        else:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    value = json.load(f)["result"]
+            except (OSError, ValueError, KeyError):
+                return None
+
+        if not all(os.path.exists(f) for f in _visualizations(value)):
+            self._memory.pop(key, None)
+            return None
+
+        self._memory[key] = value
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store an answer; values that aren't JSON-serializable stay in memory only."""
+        self._memory[key] = value
+        try:
+            payload = json.dumps({"result": value})
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._path(key), "w", encoding="utf-8") as f:
+                f.write(payload)
+        except (OSError, TypeError, ValueError):
+            pass
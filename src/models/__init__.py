@@ -0,0 +1,4 @@
+"""Model wrappers adding provider-specific request options."""
+from .cached_model import PromptCachingLiteLLMModel
+
+__all__ = ['PromptCachingLiteLLMModel']
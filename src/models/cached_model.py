@@ -0,0 +1,71 @@
+"""
+LiteLLM model with provider-side prompt caching for the static system prompt.
+
+The system prompt is several KB of fixed instructions re-sent on every agent
+step. For Anthropic models it is sent as content blocks marked with
+`cache_control`, so later steps read it from the provider's prompt cache.
+Gemini and OpenAI cache repeated prefixes automatically and get the plain
+request.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from smolagents import LiteLLMModel
+
+_log = logging.getLogger("polars_agent.models")
+_log.addHandler(logging.NullHandler())
+
+
+def supports_cache_control(model_id: str) -> bool:
+    """Whether the provider honors explicit `cache_control` content blocks."""
+    return model_id.startswith("anthropic/") or "claude" in model_id
+
+
+class PromptCachingLiteLLMModel(LiteLLMModel):
+    """LiteLLMModel that sends the system prompt as cacheable content blocks."""
+
+    def __init__(self, *args: Any, system_blocks: Optional[List[Dict[str, Any]]] = None, **kwargs: Any):
+        """
+        Args:
+            system_blocks: Content blocks (with cache_control markers) that make
+                up the system prompt
+            *args, **kwargs: Passed through to LiteLLMModel
+        """
+        super().__init__(*args, **kwargs)
+        self.system_blocks = system_blocks
+        self.cache_read_input_tokens = 0
+        self.cache_creation_input_tokens = 0
+
+    def _prepare_completion_kwargs(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        completion_kwargs = super()._prepare_completion_kwargs(*args, **kwargs)
+        if self.system_blocks and supports_cache_control(self.model_id):
+            self._apply_system_blocks(completion_kwargs.get("messages", []))
+        return completion_kwargs
+
+    def _apply_system_blocks(self, messages: List[Dict[str, Any]]) -> None:
+        """Swap the system message content for the cache-marked blocks."""
+        if not messages or messages[0].get("role") != "system":
+            return
+
+        content = messages[0]["content"]
+        if isinstance(content, str):
+            text = content
+        else:
+            text = "".join(block.get("text", "") for block in content if block.get("type") == "text")
+
+        # Only substitute when the blocks reproduce the rendered prompt
+        # (template rendering drops the trailing newline)
+        if text.strip() == "".join(block["text"] for block in self.system_blocks).strip():
+            messages[0]["content"] = [dict(block) for block in self.system_blocks]
+
+    def generate(self, *args: Any, **kwargs: Any):
+        message = super().generate(*args, **kwargs)
+        usage = getattr(message.raw, "usage", None)
+        if usage is not None:
+            cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+            cache_creation = getattr(usage, "cache_creation_input_tokens", None) or 0
+            self.cache_read_input_tokens += cache_read
+            self.cache_creation_input_tokens += cache_creation
+            if cache_read or cache_creation:
+                _log.debug("Prompt cache: read=%d created=%d tokens", cache_read, cache_creation)
+        return message
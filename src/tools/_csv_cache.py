@@ -0,0 +1,294 @@
+"""
+Shared CSV helpers and caches for the data tools.
+
+The tools scan the CSV lazily and run each report as one query with
+collect_streaming, so the full file is never materialized.
+
+Everything is keyed by file fingerprint (path, mtime, size, opted-in sidecar):
+- scan_file hands every tool the same LazyFrame for a file, so the CSV is
+  scanned once per process rather than once per tool call
+- column_stats caches the per-column aggregates the profiler and validator
+  both need, so during one analysis the file is aggregated once, not per tool
+- cached_by_file memoizes whole tool reports, so a repeated tool call on an
+  unchanged file returns the previous text immediately
+
+Set POLARS_AGENT_NO_CACHE=1 to bypass the report caches.
+
+Set POLARS_AGENT_PARQUET_SIDECAR=1 to scan a same-named .parquet copy of the
+CSV instead of parsing it. The copy is used only if it is at least as new as
+the CSV and has the same columns; otherwise the CSV is scanned.
+"""
+import logging
+import os
+import threading
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import polars as pl
+
+from src.tools._dtypes import is_numeric
+
+NO_CACHE_ENV = "POLARS_AGENT_NO_CACHE"
+PARQUET_SIDECAR_ENV = "POLARS_AGENT_PARQUET_SIDECAR"
+
+# Cardinality estimates at or below this are recounted exactly, so the tools'
+# "< 20 distinct values" categorical gate never depends on an estimate
+_EXACT_UNIQUE_LIMIT = 32
+
+# Above this size, cardinalities come from the first SAMPLE_ROWS rows only;
+# row and null counts always cover the whole file
+_SAMPLE_UNIQUES_BYTES = 200 * 1024 * 1024
+SAMPLE_ROWS = 100_000
+
+# Per-column aggregations on wide files are split into plans of this many
+# columns, which collect_all runs in parallel
+_COLUMN_CHUNK = 64
+
+_lock = threading.Lock()
+
+_log = logging.getLogger("polars_agent.tools")
+_log.addHandler(logging.NullHandler())
+
+# (path, mtime_ns) of an opted-in Parquet sidecar, or None for the CSV itself
+Sidecar = Optional[Tuple[str, int]]
+
+
+class ColumnStats(NamedTuple):
+    """Per-column aggregates of one CSV file. Shared between callers; don't mutate."""
+
+    n_rows: int
+    schema: pl.Schema
+    null_counts: Dict[str, int]
+    # Non-numeric columns only; cardinality drives the categorical/text split.
+    # Exact up to _EXACT_UNIQUE_LIMIT, a HyperLogLog estimate above it
+    unique_counts: Dict[str, int]
+    # True when unique_counts cover only the first SAMPLE_ROWS rows
+    sampled: bool = False
+
+
+def _fingerprint(csv_path: str) -> Tuple[str, int, int, Sidecar]:
+    path = os.path.abspath(csv_path)
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size, _parquet_sidecar(path, stat.st_mtime_ns)
+
+
+def _parquet_sidecar(path: str, mtime_ns: int) -> Sidecar:
+    """Return the opted-in Parquet copy of the CSV if it isn't older than it."""
+    if not os.environ.get(PARQUET_SIDECAR_ENV):
+        return None
+    sidecar = os.path.splitext(path)[0] + ".parquet"
+    try:
+        sidecar_mtime_ns = os.stat(sidecar).st_mtime_ns
+    except OSError:
+        return None
+    return (sidecar, sidecar_mtime_ns) if sidecar_mtime_ns >= mtime_ns else None
+
+
+def collect_streaming(lf: pl.LazyFrame) -> pl.DataFrame:
+    """
+    Collect a query with the streaming engine, falling back to the default one.
+
+    Args:
+        lf: Query to execute
+
+    Returns:
+        Collected DataFrame
+    """
+    try:
+        return lf.collect(engine="streaming")
+    except pl.exceptions.PolarsError:
+        # Some plans aren't supported by the streaming engine
+        return lf.collect()
+
+
+def collect_all_streaming(queries: List[pl.LazyFrame]) -> List[pl.DataFrame]:
+    """
+    Collect several queries in parallel, like collect_streaming does for one.
+
+    Args:
+        queries: Queries to execute
+
+    Returns:
+        Collected DataFrames, in the order of queries
+    """
+    try:
+        return pl.collect_all(queries, engine="streaming")
+    except pl.exceptions.PolarsError:
+        return pl.collect_all(queries)
+
+
+def chunked_selects(
+    lf: pl.LazyFrame,
+    columns: List[str],
+    exprs: Callable[[List[str]], List[pl.Expr]],
+    first: Sequence[pl.Expr] = (),
+) -> List[pl.LazyFrame]:
+    """
+    Split per-column aggregations of lf into one select per column chunk.
+
+    Args:
+        lf: Query to aggregate
+        columns: Columns to aggregate
+        exprs: Builds the single-row aggregation expressions for a chunk of columns
+        first: Extra expressions (e.g. pl.len()) added to the first select only
+
+    Returns:
+        Independent queries for collect_merged
+    """
+    chunks = [columns[i:i + _COLUMN_CHUNK] for i in range(0, len(columns), _COLUMN_CHUNK)]
+    if first and not chunks:
+        chunks = [[]]
+    return [
+        lf.select(*(first if i == 0 else ()), *exprs(chunk))
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def collect_merged(queries: List[pl.LazyFrame]) -> Dict[str, Any]:
+    """
+    Collect single-row aggregation queries in parallel and merge their rows.
+
+    Args:
+        queries: Queries returning one row each, with distinct column names
+
+    Returns:
+        Mapping of every output column to its value
+    """
+    row: Dict[str, Any] = {}
+    for frame in collect_all_streaming(queries):
+        row.update(frame.row(0, named=True))
+    return row
+
+
+@lru_cache(maxsize=32)
+def _scan(path: str, mtime_ns: int, size: int, sidecar: Sidecar) -> pl.LazyFrame:
+    # mtime_ns and size are only part of the cache key
+    csv_lf = pl.scan_csv(path, ignore_errors=True)
+    if sidecar is None:
+        return csv_lf
+    parquet_lf = pl.scan_parquet(sidecar[0])
+    # A copy with other columns was written from other data; the CSV wins
+    if parquet_lf.collect_schema().names() != csv_lf.collect_schema().names():
+        _log.warning("ignoring %s: its columns differ from %s", sidecar[0], path)
+        return csv_lf
+    return parquet_lf
+
+
+def scan_file(csv_path: str) -> pl.LazyFrame:
+    """
+    Return the shared lazy scan of a CSV file.
+
+    LazyFrames are immutable, so callers build their queries on top of the
+    same scan; a new one is created only when the file changes. With
+    POLARS_AGENT_PARQUET_SIDECAR set, a same-named .parquet file at least as
+    new as the CSV and with the same columns is scanned instead.
+
+    Args:
+        csv_path: Path to the CSV file
+
+    Returns:
+        LazyFrame scanning the CSV with ignore_errors=True, or its Parquet sidecar
+
+    Raises:
+        OSError: If the file can't be stat-ed
+    """
+    return _scan(*_fingerprint(csv_path))
+
+
+@lru_cache(maxsize=32)
+def _column_stats(path: str, mtime_ns: int, size: int, sidecar: Sidecar) -> ColumnStats:
+    lf = _scan(path, mtime_ns, size, sidecar)
+    schema = lf.collect_schema()
+    columns = schema.names()
+    non_numeric = [col for col, dtype in schema.items() if not is_numeric(dtype)]
+    text_cols = set(non_numeric)
+    row_count = [pl.len().alias("__n_rows__")]
+
+    def nulls(chunk: List[str]) -> List[pl.Expr]:
+        return [pl.col(chunk).null_count().name.suffix("__nulls")]
+
+    def uniques(chunk: List[str]) -> List[pl.Expr]:
+        chunk = [col for col in chunk if col in text_cols]
+        return [pl.col(chunk).approx_n_unique().name.suffix("__uniq")] if chunk else []
+
+    sampled = size > _SAMPLE_UNIQUES_BYTES
+    if sampled:
+        # Cardinality only steers the categorical/text split, so a bounded
+        # sample is enough; the counts still stream over the whole file
+        uniques_lf = lf.head(SAMPLE_ROWS)
+        queries = chunked_selects(lf, columns, nulls, first=row_count)
+        queries += chunked_selects(uniques_lf, non_numeric, uniques)
+    else:
+        uniques_lf = lf
+        queries = chunked_selects(
+            lf, columns, lambda chunk: nulls(chunk) + uniques(chunk), first=row_count
+        )
+    stats = collect_merged(queries)
+    unique_counts = {col: stats[f"{col}__uniq"] for col in non_numeric}
+
+    # Only columns near the categorical threshold need an exact hash-set count
+    near = [col for col, n in unique_counts.items() if n <= _EXACT_UNIQUE_LIMIT]
+    if near:
+        exact = collect_streaming(uniques_lf.select(pl.col(near).n_unique())).row(0, named=True)
+        unique_counts.update(exact)
+
+    return ColumnStats(
+        n_rows=stats["__n_rows__"],
+        schema=schema,
+        null_counts={col: stats[f"{col}__nulls"] for col in columns},
+        unique_counts=unique_counts,
+        sampled=sampled,
+    )
+
+
+def column_stats(csv_path: str) -> ColumnStats:
+    """
+    Return row count, schema, null counts and cardinalities for a CSV file.
+
+    Computed with one lazy query per 64 columns, run in parallel, and
+    cached while the file is unchanged.
+
+    Args:
+        csv_path: Path to the CSV file
+
+    Returns:
+        ColumnStats for the file
+    """
+    key = _fingerprint(csv_path)
+    # Serialize so tools running in parallel wait for one scan instead of each scanning
+    with _lock:
+        return _column_stats(*key)
+
+
+def cached_by_file(func: Callable[[str], str]) -> Callable[[str], str]:
+    """
+    Memoize a report function of one CSV path by the file's fingerprint.
+
+    func always gets the path as the caller passed it, so reports quote the
+    user's path rather than its absolute form. Paths that can't be stat-ed
+    (e.g. missing files) and runs with POLARS_AGENT_NO_CACHE set call func
+    directly, so a missing file is re-checked on every call.
+
+    Args:
+        func: Function taking a CSV path and returning its report text
+
+    Returns:
+        Wrapped function with a cache_clear() attribute
+    """
+    @lru_cache(maxsize=32)
+    def _cached(csv_path: str, path: str, mtime_ns: int, size: int, sidecar: Sidecar) -> str:
+        # The fingerprint is only part of the cache key
+        return func(csv_path)
+
+    @wraps(func)
+    def wrapper(csv_path: str) -> str:
+        if os.environ.get(NO_CACHE_ENV):
+            return func(csv_path)
+        try:
+            key = _fingerprint(csv_path)
+        except OSError:
+            return func(csv_path)
+        return _cached(csv_path, *key)
+
+    wrapper.cache_clear = _cached.cache_clear  # type: ignore[attr-defined]
+    return wrapper
@@ -0,0 +1,9 @@
+"""
+Typed dtype classification shared by the data tools.
+"""
+import polars as pl
+
+
+def is_numeric(dtype: pl.DataType) -> bool:
+    """Return True for integer, float and decimal dtypes."""
+    return dtype.is_numeric()
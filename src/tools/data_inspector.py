@@ -1,10 +1,24 @@
 """
 DataInspectorTool: Analyzes schema, nulls, and basic statistics.
 """
+import json
+
 import polars as pl
 from smolagents import Tool
 from typing import Dict, Any
 
+from src.tools._csv_cache import (
+    SAMPLE_ROWS,
+    cached_by_file,
+    chunked_selects,
+    collect_merged,
+    column_stats,
+    scan_file,
+)
+from src.tools._dtypes import is_numeric
+
+__all__ = ['DataInspectorTool']
+
 
 class DataInspectorTool(Tool):
     name = "data_inspector"
@@ -15,12 +29,13 @@ class DataInspectorTool(Tool):
         csv_path: Path to the CSV file to inspect
 
     Returns:
-        Detailed information about:
-        - Column data types
-        - Null/missing value counts
-        - Unique value counts
-        - Basic statistics for numeric columns
-        - Sample values for categorical columns
+        Compact JSON with:
+        - shape: [rows, columns]
+        - columns, dtypes, nulls, uniques, kinds: parallel per-column arrays,
+          kind being NUMERIC, CATEGORICAL or TEXT
+        - estimated: true when the file is over 200MB; uniques then come
+          from the first 100k rows (rows and nulls always cover the whole file)
+        - warnings: columns with nulls and their percentage
     """
 
     inputs = {
@@ -32,60 +47,60 @@ class DataInspectorTool(Tool):
     output_type = "string"
 
     def forward(self, csv_path: str) -> str:
-        """Inspect dataframe and return detailed analysis."""
+        """Inspect dataframe and return a compact JSON summary."""
+        return self._inspect(csv_path)
+
+    @staticmethod
+    @cached_by_file
+    def _inspect(csv_path: str) -> str:
         try:
-            df = pl.read_csv(csv_path, ignore_errors=True)
-            n_rows, n_cols = df.shape
+            # Row and null counts cover the whole file and are shared with
+            # the validator and profiler, so every report agrees on them
+            stats = column_stats(csv_path)
+            columns = stats.schema.names()
+            dtypes = stats.schema.dtypes()
+            numeric = [col for col, dtype in stats.schema.items() if is_numeric(dtype)]
+
+            # Large files: count numeric uniques over the same first rows the
+            # non-numeric cardinalities come from
+            lf = scan_file(csv_path)
+            if stats.sampled:
+                lf = lf.head(SAMPLE_ROWS)
+            numeric_uniques = collect_merged(chunked_selects(
+                lf, numeric, lambda chunk: [pl.col(chunk).n_unique()]
+            )) if numeric else {}
+
+            n_rows = stats.n_rows
+            nulls = [stats.null_counts[col] for col in columns]
+            uniques = [
+                numeric_uniques[col] if col in numeric_uniques else stats.unique_counts[col]
+                for col in columns
+            ]
 
-            output_lines = [
-                f"Data shape: {n_rows} rows, {n_cols} columns",
-                "\nColumn Analysis:"
+            # Classify column type
+            kinds = [
+                "NUMERIC" if col in numeric_uniques
+                else "CATEGORICAL" if unique < 20  # Low cardinality = likely categorical
+                else "TEXT"
+                for col, unique in zip(columns, uniques)
             ]
 
-            # Categorize columns
-            numeric_cols = []
-            categorical_cols = []
-            columns_with_nulls = []
-
-            # Analyze each column
-            for col in df.columns:
-                dtype = str(df[col].dtype)
-                nulls = df[col].null_count()
-
-                # Classify column type
-                if 'Int' in dtype or 'Float' in dtype:
-                    numeric_cols.append(col)
-                    col_type = "NUMERIC"
-                else:
-                    unique = df[col].n_unique()
-                    if unique < 20:  # Low cardinality = likely categorical
-                        categorical_cols.append(col)
-                        col_type = "CATEGORICAL"
-                    else:
-                        col_type = "TEXT"
-
-                # Track nulls
-                if nulls > 0:
-                    columns_with_nulls.append((col, nulls))
-
-                output_lines.append(
-                    f"  {col}: {dtype} ({col_type}), nulls={nulls}"
-                )
-
-            # Add summary
-            output_lines.append("\nSummary:")
-            output_lines.append(f"  Numeric: {numeric_cols}")
-            output_lines.append(f"  Categorical: {categorical_cols}")
-
-            if columns_with_nulls:
-                output_lines.append(f"\nColumns with nulls:")
-                for col, count in columns_with_nulls:
-                    pct = (count / n_rows) * 100
-                    output_lines.append(f"  {col}: {count} ({pct:.1f}%)")
-            else:
-                output_lines.append("\nNo nulls - clean dataset")
-
-            return "\n".join(output_lines)
+            # Parallel arrays keep key names out of every per-column entry
+            payload: Dict[str, Any] = {
+                "shape": [n_rows, len(columns)],
+                "columns": columns,
+                "dtypes": [str(dtype) for dtype in dtypes],
+                "nulls": nulls,
+                "uniques": uniques,
+                "kinds": kinds,
+                "estimated": stats.sampled,
+                "warnings": [
+                    f"{col}: {count} nulls ({count / n_rows * 100:.1f}%)"
+                    for col, count in zip(columns, nulls) if count > 0
+                ],
+            }
+
+            return json.dumps(payload, separators=(",", ":"))
 
         except Exception as e:
             return f"ERROR: Failed to inspect data: {str(e)}"
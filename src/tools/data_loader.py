@@ -3,9 +3,22 @@ PolarsDataLoaderTool: Robust CSV loading with error handling and auto-detection.
 """
 import polars as pl
 from smolagents import Tool
-from typing import Dict, Any
+from typing import Iterator, Tuple
+import codecs
+import csv
 import os
 
+from src.tools._csv_cache import cached_by_file
+
+__all__ = ['PolarsDataLoaderTool']
+
+_SNIFF_BYTES = 8192
+_SEPARATORS = ',;\t|'
+
+# Errors that mean "this dialect doesn't parse the file"; anything else
+# propagates to the caller
+_PARSE_ERRORS = (pl.exceptions.PolarsError, ValueError, OSError)
+
 
 class PolarsDataLoaderTool(Tool):
     name = "polars_data_loader"
@@ -33,59 +46,106 @@ class PolarsDataLoaderTool(Tool):
 
     def forward(self, csv_path: str) -> str:
         """Load CSV with error handling and return summary."""
+        return self._load(csv_path)
+
+    @staticmethod
+    @cached_by_file
+    def _load(csv_path: str) -> str:
         try:
             # Validate path
             if not os.path.exists(csv_path):
                 return f"ERROR: File not found at path: {csv_path}"
 
-            # Try loading with default settings first
-            try:
-                df = pl.read_csv(csv_path)
-            except Exception as e:
-                df = None
-
-            # If default load produced only 1 column, the separator is likely wrong.
-            # Retry with alternative separators to find the right one.
-            if df is not None and len(df.columns) == 1:
-                df = None
-
-            if df is None:
-                encodings = ['utf-8', 'latin-1', 'iso-8859-1']
-                separators = [';', '\t', '|', ',']
-
-                for encoding in encodings:
-                    for sep in separators:
-                        try:
-                            candidate = pl.read_csv(
-                                csv_path,
-                                encoding=encoding,
-                                separator=sep,
-                                ignore_errors=True
-                            )
-                            if len(candidate.columns) > 1:
-                                df = candidate
-                                break
-                        except:
-                            continue
-                    if df is not None:
-                        break
-
-                if df is None:
-                    return f"ERROR: Could not load CSV with various encoding/separator combinations."
+            # Scan lazily and collect only shape + null counts (no full DataFrame).
+            # Try default settings first; a single-column result means the
+            # separator is likely wrong, so fall through to the sniffed dialect.
+            summary = None
+            for lf in PolarsDataLoaderTool._candidate_frames(csv_path):
+                try:
+                    schema = lf.collect_schema()
+                    if len(schema) <= 1:
+                        continue
+                    stats = lf.select(
+                        pl.len().alias("__rows__"),
+                        pl.all().null_count()
+                    ).collect()
+                except _PARSE_ERRORS:
+                    continue
+                summary = (schema, stats)
+                break
+
+            if summary is None:
+                return f"ERROR: Could not load CSV with the default or detected encoding/separator."
 
             # Get basic info
-            n_rows, n_cols = df.shape
-            columns = list(df.columns)
-            dtypes = [str(dtype) for dtype in df.dtypes]
+            schema, stats = summary
+            # One row holds the row count followed by each column's null count
+            n_rows, *nulls = stats.row(0)
+            n_cols = len(schema)
+            columns = schema.names()
+            dtypes = [str(dtype) for dtype in schema.dtypes()]
 
             # Format as readable string with key info
             output = f"""CSV loaded: {csv_path}
 Shape: {n_rows} rows, {n_cols} columns
 Columns: {columns}
 Types: {dtypes}
-Nulls: {[df[col].null_count() for col in columns]}"""
+Nulls: {nulls}"""
 
             return output
 
         except Exception as e:
             return f"ERROR: Unexpected error loading CSV: {str(e)}"
+
+    @staticmethod
+    def _candidate_frames(csv_path: str) -> Iterator[pl.LazyFrame]:
+        """Yield a lazy frame for the default settings, then one for the sniffed dialect."""
+        yield pl.scan_csv(csv_path)
+
+        encoding, sep = PolarsDataLoaderTool._sniff_dialect(csv_path)
+        if encoding == 'utf-8':
+            yield pl.scan_csv(csv_path, separator=sep, ignore_errors=True)
+        else:
+            # scan_csv only decodes UTF-8; other encodings need an eager read
+            try:
+                lf = pl.read_csv(
+                    csv_path,
+                    encoding=encoding,
+                    separator=sep,
+                    ignore_errors=True
+                ).lazy()
+            except _PARSE_ERRORS:
+                return
+            yield lf
+
+    @staticmethod
+    def _sniff_dialect(csv_path: str) -> Tuple[str, str]:
+        """
+        Detect encoding and separator from the first 8 KB of the file.
+
+        Args:
+            csv_path: Path to the CSV file
+
+        Returns:
+            (encoding, separator) tuple; falls back to latin-1 when the sample
+            isn't valid UTF-8 and to the most frequent header delimiter when
+            csv.Sniffer can't decide
+        """
+        with open(csv_path, 'rb') as f:
+            sample = f.read(_SNIFF_BYTES)
+
+        try:
+            # Incremental decode tolerates a multi-byte char cut at the boundary
+            text = codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            text = sample.decode('latin-1')
+            encoding = 'latin-1'
+
+        try:
+            sep = csv.Sniffer().sniff(text, delimiters=_SEPARATORS).delimiter
+        except csv.Error:
+            header = text.split('\n', 1)[0]
+            sep = max(_SEPARATORS, key=header.count)
+
+        return encoding, sep
@@ -1,11 +1,28 @@
 """
 DataProfilerTool: Deep profiling including distributions and correlations.
 """
+import io
+
 import polars as pl
 from smolagents import Tool
 from typing import Dict, Any
 import numpy as np
 
+from src.tools._csv_cache import (
+    cached_by_file,
+    collect_all_streaming,
+    collect_streaming,
+    column_stats,
+    scan_file,
+)
+from src.tools._dtypes import is_numeric
+
+__all__ = ['DataProfilerTool']
+
+# The report is sent in every prompt, so ranges cover the first few numeric
+# columns only; the model computes others itself when the task needs them
+_MAX_RANGE_COLS = 3
+
 
 class DataProfilerTool(Tool):
     name = "data_profiler"
@@ -21,7 +38,6 @@ class DataProfilerTool(Tool):
         - Correlation analysis between numeric columns
         - Cardinality analysis for categorical columns
         - Temporal patterns if date columns exist
-        - Recommendations for appropriate visualizations
     """
 
     inputs = {
@@ -33,81 +49,119 @@ class DataProfilerTool(Tool):
     output_type = "string"
 
     def forward(self, csv_path: str) -> str:  # pragma: no cover
-        """Profile dataframe deeply and return recommendations."""
+        """Profile dataframe deeply and return the report."""
+        return self._profile(csv_path)
+
+    @staticmethod
+    @cached_by_file
+    def _profile(csv_path: str) -> str:
         try:
-            # Load the dataframe
-            df = pl.read_csv(csv_path, ignore_errors=True)
+            # Schema and cardinalities are shared with the validator
+            col_stats = column_stats(csv_path)
+            lf = scan_file(csv_path)
 
-            output_lines = ["PROFILING REPORT", ""]
+            # One buffer for the whole report instead of a line list plus a final join
+            buf = io.StringIO()
+            w = buf.write
+            w("PROFILING REPORT\n\n")
 
             # Identify column types
-            numeric_cols = []
-            categorical_cols = []
-
-            for col in df.columns:
-                dtype = str(df[col].dtype)
-                n_unique = df[col].n_unique()
-                n_rows = len(df)
-
-                if 'int' in dtype.lower() or 'float' in dtype.lower():
-                    numeric_cols.append(col)
-                elif n_unique < 20:  # Low cardinality
-                    categorical_cols.append(col)
+            numeric_cols = [col for col, dtype in col_stats.schema.items() if is_numeric(dtype)]
+            categorical_cols = [
+                col for col, n_unique in col_stats.unique_counts.items()
+                if n_unique < 20  # Low cardinality
+            ]
+            # Filter by the cached null counts up front, so no aggregation below
+            # runs on an empty column: quantiles need one value, corr needs two
+            non_null = {
+                col: col_stats.n_rows - col_stats.null_counts[col] for col in numeric_cols
+            }
+            range_cols = [col for col in numeric_cols if non_null[col] > 0][:_MAX_RANGE_COLS]
+            corr_cols = [col for col in numeric_cols if non_null[col] >= 2][:6]
+            # Upper triangle of the correlation matrix: every pair once
+            pairs = [
+                (corr_cols[i], corr_cols[j])
+                for i, j in zip(*np.triu_indices(len(corr_cols), k=1))
+            ]
+
+            # Decimal counts as numeric but pl.corr doesn't support it, so
+            # the statistics below read decimals as Float64
+            values = {
+                col: pl.col(col).cast(pl.Float64)
+                if isinstance(col_stats.schema[col], pl.Decimal) else pl.col(col)
+                for col in numeric_cols
+            }
+
+            # Numeric ranges and correlations come from one plan and one collect
+            exprs = []
+            for col in range_cols:
+                c = values[col]
+                q1 = c.quantile(0.25)
+                q3 = c.quantile(0.75)
+                iqr = q3 - q1
+                # Tukey fences; nulls stay null under is_between and aren't counted
+                inside = c.is_between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+                exprs += [
+                    c.min().alias(f"{col}__min"),
+                    c.max().alias(f"{col}__max"),
+                    (~inside).sum().alias(f"{col}__outliers"),
+                ]
+            # pl.corr drops nulls pairwise, unlike DataFrame.corr() which
+            # turns them into NaN
+            exprs += [
+                pl.corr(values[col1], values[col2]).alias(f"__corr{i}")
+                for i, (col1, col2) in enumerate(pairs)
+            ]
+
+            stats = collect_streaming(lf.select(exprs)).row(0, named=True) if exprs else {}
 
             # Numeric analysis
             if numeric_cols:
-                output_lines.append("Numeric ranges:")
-                for col in numeric_cols[:3]:  # Limit to first 3
-                    try:
-                        values = df[col].drop_nulls()
-                        if len(values) > 0:
-                            q1 = values.quantile(0.25)
-                            q3 = values.quantile(0.75)
-                            iqr = q3 - q1
-                            lower_bound = q1 - 1.5 * iqr
-                            upper_bound = q3 + 1.5 * iqr
-                            outliers = ((values < lower_bound) | (values > upper_bound)).sum()
-
-                            output_lines.append(f"  {col}: [{values.min()}, {values.max()}], outliers={outliers}")
-                    except:
-                        pass
-                output_lines.append("")
+                w("Numeric ranges:\n")
+                for col in range_cols:
+                    w(
+                        f"  {col}: [{stats[f'{col}__min']}, {stats[f'{col}__max']}], "
+                        f"outliers={stats[f'{col}__outliers']}\n"
+                    )
+                w("\n")
 
             # Correlation analysis
             if len(numeric_cols) >= 2:
-                output_lines.append("Correlations (|r| > 0.5):")
-                try:
-                    correlations = []
-                    for i, col1 in enumerate(numeric_cols[:5]):
-                        for col2 in numeric_cols[i+1:6]:
-                            try:
-                                corr = df.select([
-                                    pl.corr(col1, col2).alias("correlation")
-                                ]).item()
-                                if abs(corr) > 0.5:
-                                    correlations.append((col1, col2, corr))
-                            except:
-                                pass
-
-                    if correlations:
-                        for col1, col2, corr in sorted(correlations, key=lambda x: abs(x[2]), reverse=True):
-                            output_lines.append(f"  {col1} <-> {col2}: {corr:.3f}")
-                    else:
-                        output_lines.append("  None found")
-                except Exception as e:
-                    output_lines.append(f"  Error: {str(e)}")
-                output_lines.append("")
+                w("Correlations (|r| > 0.5):\n")
+                # Filter and rank the pair triples in Polars; NaN (constant
+                # column) becomes null so it never passes the threshold
+                strength = pl.col("r").fill_nan(None).abs()
+                correlations = pl.DataFrame(
+                    {
+                        "a": [col1 for col1, _ in pairs],
+                        "b": [col2 for _, col2 in pairs],
+                        "r": [stats[f"__corr{i}"] for i in range(len(pairs))],
+                    },
+                    schema={"a": pl.String, "b": pl.String, "r": pl.Float64},
+                ).filter(strength > 0.5).sort(strength, descending=True, maintain_order=True)
+
+                if correlations.height:
+                    for col1, col2, corr in correlations.iter_rows():
+                        w(f"  {col1} <-> {col2}: {corr:.3f}\n")
+                else:
+                    w("  None found\n")
+                w("\n")
 
             # Categorical analysis
             if categorical_cols:
-                output_lines.append("Categorical top-5 values:")
-                for col in categorical_cols[:3]:  # Limit to first 3
-                    value_counts = df[col].value_counts().sort("count", descending=True)
-                    top_values = value_counts.head(5)
-                    output_lines.append(f"  {col}: {', '.join([str(row[0]) for row in top_values.iter_rows()])}")
-                output_lines.append("")
-
-            return "\n".join(output_lines)
+                w("Categorical top-5 values:\n")
+                top_cols = categorical_cols[:3]  # Limit to first 3
+                # Partial top-k per column (no full sort), all plans run in parallel;
+                # top_k doesn't guarantee order, so the 5 rows are sorted after
+                queries = [
+                    lf.group_by(col).len().top_k(5, by="len").sort("len", descending=True)
+                    for col in top_cols
+                ]
+                for col, top_values in zip(top_cols, collect_all_streaming(queries)):
+                    w(f"  {col}: {', '.join([str(row[0]) for row in top_values.iter_rows()])}\n")
+                w("\n")
+
+            return buf.getvalue()
 
         except Exception as e:
             return f"ERROR: Failed to profile data: {str(e)}"
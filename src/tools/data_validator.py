@@ -1,9 +1,15 @@
 """
 DataValidatorTool: Validates CSV quality and provides actionable recommendations.
 """
-import polars as pl
+import io
+
 from smolagents import Tool
 
+from src.tools._csv_cache import SAMPLE_ROWS, cached_by_file, column_stats
+from src.tools._dtypes import is_numeric
+
+__all__ = ['DataValidatorTool']
+
 
 class DataValidatorTool(Tool):
     name = "data_validator"
@@ -27,58 +33,65 @@ class DataValidatorTool(Tool):
 
     def forward(self, csv_path: str) -> str:
         """Validate data and return actionable recommendations."""
+        return self._validate(csv_path)
+
+    @staticmethod
+    @cached_by_file
+    def _validate(csv_path: str) -> str:
         try:
-            df = pl.read_csv(csv_path, ignore_errors=True)
-            n_rows, n_cols = df.shape
+            # Row count, null counts and cardinalities, shared with the profiler
+            stats = column_stats(csv_path)
+            n_rows = stats.n_rows
 
-            output = ["QUALITY REPORT", ""]
+            buf = io.StringIO()
+            w = buf.write
+            w("QUALITY REPORT\n\n")
 
             # Check for nulls
             null_cols = []
-            for col in df.columns:
-                null_count = df[col].null_count()
+            for col, dtype in stats.schema.items():
+                null_count = stats.null_counts[col]
                 if null_count > 0:
                     pct = (null_count / n_rows) * 100
-                    null_cols.append((col, null_count, pct))
+                    null_cols.append((col, dtype, null_count, pct))
 
             if null_cols:
-                output.append("Nulls detected:")
-                for col, count, pct in null_cols:
-                    output.append(f"  {col}: {count} ({pct:.1f}%)")
-
-                output.append("\nFix options:")
-                output.append("  df.drop_nulls() OR")
-                for col, _, _ in null_cols[:3]:  # Limit to first 3
-                    dtype = str(df[col].dtype)
-                    if 'Int' in dtype or 'Float' in dtype:
-                        output.append(f"  pl.col('{col}').fill_null(0)")
+                w("Nulls detected:\n")
+                for col, _, count, pct in null_cols:
+                    w(f"  {col}: {count} ({pct:.1f}%)\n")
+
+                w("\nFix options:\n")
+                w("  df.drop_nulls() OR\n")
+                for col, dtype, _, _ in null_cols[:3]:  # Limit to first 3
+                    if is_numeric(dtype):
+                        w(f"  pl.col('{col}').fill_null(0)\n")
                     else:
-                        output.append(f"  pl.col('{col}').fill_null('Unknown')")
-                output.append("")
+                        w(f"  pl.col('{col}').fill_null('Unknown')\n")
+                w("\n")
             else:
-                output.append("No nulls - clean dataset")
-                output.append("")
+                w("No nulls - clean dataset\n\n")
 
-            # Check data types
-            output.append("Column types:")
+            # Check data types; on very large files the categorical/text
+            # split is judged from a sample
+            if stats.sampled:
+                w(f"Column types (sampled: first {SAMPLE_ROWS // 1000}k rows):\n")
+            else:
+                w("Column types:\n")
             numeric_cols = []
             categorical_cols = []
 
-            for col in df.columns:
-                dtype = str(df[col].dtype)
-                unique = df[col].n_unique()
-
-                if 'Int' in dtype or 'Float' in dtype:
+            for col, dtype in stats.schema.items():
+                if is_numeric(dtype):
                     numeric_cols.append(col)
-                    output.append(f"  {col}: {dtype} (NUMERIC)")
+                    w(f"  {col}: {dtype} (NUMERIC)\n")
                 else:
-                    if unique < 20:
+                    if stats.unique_counts[col] < 20:
                         categorical_cols.append(col)
-                        output.append(f"  {col}: {dtype} (CATEGORICAL)")
+                        w(f"  {col}: {dtype} (CATEGORICAL)\n")
                     else:
-                        output.append(f"  {col}: {dtype} (TEXT)")
+                        w(f"  {col}: {dtype} (TEXT)\n")
 
-            return "\n".join(output)
+            return buf.getvalue()
 
         except Exception as e:
             return f"ERROR: Validation failed: {str(e)}"
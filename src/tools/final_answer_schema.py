@@ -0,0 +1,66 @@
+"""
+Output contract for the agent's final_answer() call.
+
+The CodeAgent ends a run by calling final_answer() from generated code, so
+the contract is enforced with a smolagents final-answer check: an answer
+that doesn't match FinalAnswer fails the step with the validation error,
+and the model fixes the call in its next step instead of the whole run
+being retried.
+"""
+import ast
+import json
+from typing import Any, List
+
+from pydantic import BaseModel, Field
+
+from src.prompts.system_prompts import BATCH_ANSWER_FORMAT
+
+
+class FinalAnswer(BaseModel):
+    """Structured final answer: concise findings plus the saved plot files."""
+
+    key_findings: List[str] = Field(min_length=1, max_length=5)
+    visualizations: List[str] = Field(default_factory=list)
+
+
+def _parse_answer(text: str) -> Any:
+    """Read a string answer as JSON or as a Python dict literal."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text.strip())
+    except (ValueError, SyntaxError):
+        raise ValueError(
+            'final_answer() needs a dict like {"key_findings": [...], "visualizations": [...]}, '
+            "not free text"
+        ) from None
+
+
+def check_final_answer(final_answer: Any, memory: Any, agent: Any = None) -> bool:
+    """
+    Validate a final answer before the agent accepts it.
+
+    Answers must match FinalAnswer; a string is parsed as JSON or a dict
+    literal first. Free text is accepted only in batched runs, whose task
+    asks for one string with a '## Task <n>' section per task.
+
+    Args:
+        final_answer: Value passed to final_answer() by the generated code
+        memory: Agent memory (unused, part of the smolagents check signature)
+        agent: The running agent, whose task tells batched runs apart
+
+    Returns:
+        True when the answer is acceptable
+
+    Raises:
+        ValueError: If a string answer is neither a batch answer nor a dict
+        pydantic.ValidationError: If the answer doesn't match FinalAnswer
+    """
+    if isinstance(final_answer, str):
+        if BATCH_ANSWER_FORMAT in (getattr(agent, "task", None) or ""):
+            return bool(final_answer.strip())
+        final_answer = _parse_answer(final_answer)
+    FinalAnswer.model_validate(final_answer)
+    return True
@@ -0,0 +1,216 @@
+"""
+Unit tests for the agent controller and model wrapper.
+No API calls — the final answer and the completion call are stubbed.
+"""
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.agent_controller import MAX_BATCH_TASKS, DataAnalysisAgent, _split_batch_answer
+from src.memory import ResponseCache
+from src.prompts.system_prompts import AGENT_SYSTEM_PROMPT, system_blocks
+
+
+# ---------------------------------------------------------------------------
+# Batch answer splitting
+# ---------------------------------------------------------------------------
+
+class TestSplitBatchAnswer:
+    @pytest.mark.parametrize("answer", [
+        "## Task 1\nNorth leads\n## Task 2\nWidget tops revenue",
+        "# Task 1: regions\nNorth leads\n\n### Task 2 - products\nWidget tops revenue\n",
+    ], ids=["plain", "header-variants"])
+    def test_sections_in_task_order(self, answer):
+        assert _split_batch_answer(answer, 2) == ["North leads", "Widget tops revenue"]
+
+    def test_sections_matched_by_number(self):
+        answer = "## Task 2\nsecond\n## Task 1\nfirst"
+        assert _split_batch_answer(answer, 2) == ["first", "second"]
+
+    def test_headers_ignored_gives_full_answer_to_every_task(self):
+        answer = "North leads; Widget tops revenue"
+        assert _split_batch_answer(answer, 3) == [answer] * 3
+
+    def test_missing_sections_are_empty(self):
+        assert _split_batch_answer("## Task 1\nonly one", 3) == ["only one", "", ""]
+
+    def test_extra_sections_dropped(self):
+        answer = "## Task 1\na\n## Task 2\nb\n## Task 3\nc"
+        assert _split_batch_answer(answer, 2) == ["a", "b"]
+
+    def test_header_must_start_a_line(self):
+        answer = "## Task 1\nsee ## Task 2 below"
+        assert _split_batch_answer(answer, 2) == ["see ## Task 2 below", ""]
+
+
+class TestAnalyzeBatch:
+    @pytest.fixture
+    def agent(self, monkeypatch):
+        """Agent whose analyze() records the combined task and answers every section."""
+        # analyze_batch only calls analyze(), so skip building the model and tools
+        agent = object.__new__(DataAnalysisAgent)
+        agent.prompts = []
+
+        def analyze(csv_path, task, max_retries=3, retry_delay=4.0):
+            agent.prompts.append(task)
+            n_tasks = task.count("\n## Task ")
+            return "\n".join(f"## Task {i}\nanswer {len(agent.prompts)}.{i}" for i in range(1, n_tasks + 1))
+
+        monkeypatch.setattr(agent, "analyze", analyze)
+        return agent
+
+    def test_one_run_per_batch(self, agent):
+        tasks = [f"task {i}" for i in range(MAX_BATCH_TASKS + 2)]
+        results = agent.analyze_batch("data.csv", tasks)
+        # Capped at MAX_BATCH_TASKS per prompt; numbering restarts per batch
+        assert len(agent.prompts) == 2
+        assert "## Task 5\ntask 4" in agent.prompts[0]
+        assert "## Task 2\ntask 6" in agent.prompts[1]
+        assert results == [f"answer 1.{i}" for i in range(1, 6)] + ["answer 2.1", "answer 2.2"]
+
+    def test_unformatted_answer_shared_by_batch(self, agent, monkeypatch):
+        monkeypatch.setattr(agent, "analyze", lambda csv_path, task, *args: "Analysis failed: 429")
+        assert agent.analyze_batch("data.csv", ["a", "b"]) == ["Analysis failed: 429"] * 2
+
+
+class _SilentFormatter:
+    """Swallows everything analyze() would print."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+_ANSWER = {"key_findings": ["North leads"], "visualizations": []}
+
+
+class TestAnalyzeCache:
+    @pytest.fixture
+    def make_agent(self, tmp_path):
+        """Build an agent whose CodeAgent.run() yields the given steps and counts runs."""
+        def make(steps):
+            agent = object.__new__(DataAnalysisAgent)
+            agent.runs = 0
+
+            def run(task, stream=False):
+                agent.runs += 1
+                yield from steps()
+
+            agent.agent = SimpleNamespace(run=run)
+            agent.model = SimpleNamespace(model_id="test-model")
+            agent.formatter = _SilentFormatter()
+            agent.cache = ResponseCache(str(tmp_path / "cache"))
+            agent._run_lock = threading.Lock()
+            # The data tools aren't built; their reports don't matter here
+            agent._prepare_context = lambda csv_path: ""
+            return agent
+
+        return make
+
+    @pytest.fixture
+    def data_csv(self, tmp_path):
+        p = tmp_path / "data.csv"
+        p.write_text("a,b\n1,2\n")
+        return str(p)
+
+    @staticmethod
+    def _steps(output, **action):
+        from smolagents.memory import ActionStep, FinalAnswerStep
+        from smolagents.monitoring import Timing
+
+        def steps():
+            yield ActionStep(step_number=1, timing=Timing(start_time=0.0), **action)
+            yield FinalAnswerStep(output=output)
+
+        return steps
+
+    def test_checked_answer_stored_then_served(self, make_agent, data_csv):
+        agent = make_agent(self._steps(_ANSWER, is_final_answer=True))
+        assert agent.analyze(data_csv, "task") == _ANSWER
+        assert agent.analyze(data_csv, "task") == _ANSWER
+        # The second call is a hit and never runs the agent
+        assert agent.runs == 1
+
+    def test_max_steps_fallback_not_stored(self, make_agent, data_csv):
+        from smolagents.utils import AgentMaxStepsError
+
+        logger = SimpleNamespace(log_error=lambda *args, **kwargs: None)
+        error = AgentMaxStepsError("Reached max steps.", logger)
+        agent = make_agent(self._steps(_ANSWER, error=error))
+        agent.analyze(data_csv, "task")
+        agent.analyze(data_csv, "task")
+        assert agent.runs == 2
+
+    def test_unchecked_and_missing_answers_not_stored(self, make_agent, data_csv):
+        agent = make_agent(self._steps(_ANSWER))
+        agent.analyze(data_csv, "task")
+        agent.analyze(data_csv, "task")
+        assert agent.runs == 2
+
+        agent = make_agent(self._steps(None, is_final_answer=True))
+        assert agent.analyze(data_csv, "task") is None
+        agent.analyze(data_csv, "task")
+        assert agent.runs == 2
+
+
+# ---------------------------------------------------------------------------
+# Prompt-caching model
+# ---------------------------------------------------------------------------
+
+class _FakeCompletions:
+    """Stands in for the litellm module: records each request, answers "ok"."""
+
+    def __init__(self):
+        self.requests = []
+
+    def completion(self, **kwargs):
+        self.requests.append(kwargs)
+        message = SimpleNamespace(role="assistant", content="ok", tool_calls=None)
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=1, cache_read_input_tokens=8)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class TestPromptCachingModel:
+    @pytest.fixture
+    def make_model(self, monkeypatch):
+        from src.models import PromptCachingLiteLLMModel
+
+        fake = _FakeCompletions()
+        # Never import litellm or reach a provider
+        monkeypatch.setattr(PromptCachingLiteLLMModel, "create_client", lambda self: fake)
+
+        def make(model_id):
+            model = PromptCachingLiteLLMModel(model_id=model_id, api_key="test", system_blocks=system_blocks())
+            return model, fake.requests
+
+        return make
+
+    @staticmethod
+    def _messages(system_text):
+        from smolagents.models import ChatMessage, MessageRole
+
+        return [
+            ChatMessage(role=MessageRole.SYSTEM, content=[{"type": "text", "text": system_text}]),
+            ChatMessage(role=MessageRole.USER, content=[{"type": "text", "text": "Analyze sales.csv"}]),
+        ]
+
+    def test_anthropic_gets_cache_marked_blocks(self, make_model):
+        model, requests = make_model("anthropic/claude-sonnet-4-5")
+        model.generate(self._messages(AGENT_SYSTEM_PROMPT))
+        system, user = requests[0]["messages"]
+        assert system["content"] == system_blocks()
+        assert [block["cache_control"]["type"] for block in system["content"]] == ["ephemeral"] * 2
+        assert "cache_control" not in user["content"][0]
+        assert model.cache_read_input_tokens == 8
+
+    def test_other_providers_get_plain_prompt(self, make_model):
+        model, requests = make_model("gemini/gemini-2.5-flash")
+        model.generate(self._messages(AGENT_SYSTEM_PROMPT))
+        system = requests[0]["messages"][0]
+        assert system["content"] == [{"type": "text", "text": AGENT_SYSTEM_PROMPT}]
+
+    def test_changed_system_text_not_substituted(self, make_model):
+        model, requests = make_model("anthropic/claude-sonnet-4-5")
+        model.generate(self._messages(AGENT_SYSTEM_PROMPT + "\nExtra rule."))
+        system = requests[0]["messages"][0]
+        assert system["content"] == [{"type": "text", "text": AGENT_SYSTEM_PROMPT + "\nExtra rule."}]
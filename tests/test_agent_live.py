@@ -16,14 +16,17 @@ Results are printed as a summary table at the end via the session-scoped
 fixture so you can eyeball efficiency at a glance.
 """
 import os
-import sys
+import shutil
 import time
 import glob
 import pytest
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import polars as pl
 
 from src.agent_controller import DataAnalysisAgent
+from src.tools._csv_cache import PARQUET_SIDECAR_ENV
+
+DATASETS_DIR = os.path.join(os.path.dirname(__file__), '..', 'examples', 'sample_datasets')
 
 
 # ---------------------------------------------------------------------------
@@ -55,6 +58,28 @@ def _print_summary(request):
         print("=" * 80)
 
 
+@pytest.fixture(scope="session")
+def datasets(tmp_path_factory):
+    """
+    Copy the sample CSVs into a temp dir, each with a Parquet sidecar.
+
+    The copies are written once per session; examples/sample_datasets
+    itself is left untouched.
+    """
+    directory = tmp_path_factory.mktemp("sample_datasets")
+    for csv_path in glob.glob(os.path.join(DATASETS_DIR, "*.csv")):
+        copy = shutil.copy(csv_path, directory)
+        # Written after the copy, so the sidecar is never older than its CSV
+        pl.read_csv(copy, ignore_errors=True).write_parquet(os.path.splitext(copy)[0] + ".parquet")
+    return directory
+
+
+@pytest.fixture(autouse=True)
+def _parquet_sidecar_opt_in(monkeypatch):
+    """Let the data tools scan the Parquet copies, for the live tests only."""
+    monkeypatch.setenv(PARQUET_SIDECAR_ENV, "1")
+
+
 # ---------------------------------------------------------------------------
 # Helper
 # ---------------------------------------------------------------------------
@@ -67,7 +92,8 @@ def _run_agent(name: str, csv_path: str, task: str):
     agent = DataAnalysisAgent(
         model_name="gemini/gemini-2.5-flash",
         max_steps=12,
-        verbosity_level=0   # quiet — we only care about result
+        verbosity_level=0,  # quiet — we only care about result
+        use_cache=False     # every run must hit the model
     )
 
     start = time.time()
@@ -116,32 +142,32 @@ def _run_agent(name: str, csv_path: str, task: str):
 class TestSalesData:
     """Tests against sales_data.csv (has 2 nulls in sales_amount)."""
 
-    def test_sales_by_region(self):
+    def test_sales_by_region(self, datasets):
         _run_agent(
             name="sales_by_region",
-            csv_path="examples/sample_datasets/sales_data.csv",
+            csv_path=str(datasets / "sales_data.csv"),
             task="Show total sales by region and create a bar chart."
         )
 
-    def test_sales_by_product(self):
+    def test_sales_by_product(self, datasets):
         _run_agent(
             name="sales_by_product",
-            csv_path="examples/sample_datasets/sales_data.csv",
+            csv_path=str(datasets / "sales_data.csv"),
             task="Compare total revenue and average units sold per product. Visualize both."
         )
 
-    def test_sales_time_trend(self):
+    def test_sales_time_trend(self, datasets):
         _run_agent(
             name="sales_time_trend",
-            csv_path="examples/sample_datasets/sales_data.csv",
+            csv_path=str(datasets / "sales_data.csv"),
             task="Show daily sales trend over time with a line chart."
         )
 
-    def test_sales_null_handling(self):
+    def test_sales_null_handling(self, datasets):
         """Specifically tests whether the agent handles the 2 nulls correctly."""
         _run_agent(
             name="sales_null_handling",
-            csv_path="examples/sample_datasets/sales_data.csv",
+            csv_path=str(datasets / "sales_data.csv"),
             task="Identify and handle missing values in sales_amount. Report how many nulls exist and show the cleaned totals by region."
         )
 
@@ -149,33 +175,33 @@ class TestSalesData:
 class TestCustomerData:
     """Tests against customer_data.csv (nulls in income + purchase_frequency)."""
 
-    def test_satisfaction_by_membership(self):
+    def test_satisfaction_by_membership(self, datasets):
         _run_agent(
             name="satisfaction_by_membership",
-            csv_path="examples/sample_datasets/customer_data.csv",
+            csv_path=str(datasets / "customer_data.csv"),
             task="Show average satisfaction score by membership level with a bar chart."
         )
 
-    def test_income_age_correlation(self):
+    def test_income_age_correlation(self, datasets):
         """Common failure point: agent invents type conversions on numeric cols."""
         _run_agent(
             name="income_age_correlation",
-            csv_path="examples/sample_datasets/customer_data.csv",
+            csv_path=str(datasets / "customer_data.csv"),
             task="Plot the correlation between age and income. Include a scatter plot."
         )
 
-    def test_purchase_frequency_analysis(self):
+    def test_purchase_frequency_analysis(self, datasets):
         """Regression guard: purchase_frequency is Int64, agent must NOT map it as categorical."""
         _run_agent(
             name="purchase_freq_analysis",
-            csv_path="examples/sample_datasets/customer_data.csv",
+            csv_path=str(datasets / "customer_data.csv"),
             task="Analyze purchase_frequency distribution by membership level. Show a grouped bar chart."
         )
 
-    def test_gender_income_comparison(self):
+    def test_gender_income_comparison(self, datasets):
         _run_agent(
             name="gender_income",
-            csv_path="examples/sample_datasets/customer_data.csv",
+            csv_path=str(datasets / "customer_data.csv"),
             task="Compare average income between genders. Create a visualization."
         )
 
@@ -183,25 +209,25 @@ class TestCustomerData:
 class TestEmployeeData:
     """Tests against employee_data.csv (no nulls, has categorical performance_rating)."""
 
-    def test_salary_by_department(self):
+    def test_salary_by_department(self, datasets):
         _run_agent(
             name="salary_by_dept",
-            csv_path="examples/sample_datasets/employee_data.csv",
+            csv_path=str(datasets / "employee_data.csv"),
             task="Show average salary by department with a bar chart."
         )
 
-    def test_experience_vs_salary(self):
+    def test_experience_vs_salary(self, datasets):
         _run_agent(
             name="experience_vs_salary",
-            csv_path="examples/sample_datasets/employee_data.csv",
+            csv_path=str(datasets / "employee_data.csv"),
             task="Scatter plot of years_experience vs salary. Color by department if possible."
         )
 
-    def test_performance_by_department(self):
+    def test_performance_by_department(self, datasets):
         """performance_rating is categorical (Excellent/Good/Average) — tests string handling."""
         _run_agent(
             name="performance_by_dept",
-            csv_path="examples/sample_datasets/employee_data.csv",
+            csv_path=str(datasets / "employee_data.csv"),
             task="Show the distribution of performance ratings within each department as a stacked or grouped chart."
         )
 
@@ -209,18 +235,18 @@ class TestEmployeeData:
 class TestEdgeCases:
     """Scenarios designed to trigger known failure modes."""
 
-    def test_comprehensive_eda(self):
+    def test_comprehensive_eda(self, datasets):
         """Default task — 'do everything'. Stresses step budget."""
         _run_agent(
             name="comprehensive_eda",
-            csv_path="examples/sample_datasets/customer_data.csv",
+            csv_path=str(datasets / "customer_data.csv"),
             task="Perform comprehensive exploratory data analysis. Show distributions, correlations, and key insights."
         )
 
-    def test_multiple_visualizations(self):
+    def test_multiple_visualizations(self, datasets):
         """Agent must save multiple PNGs in one run."""
         _run_agent(
             name="multi_viz",
-            csv_path="examples/sample_datasets/sales_data.csv",
+            csv_path=str(datasets / "sales_data.csv"),
             task="Create separate visualizations for sales by region, sales by product, and daily sales over time. Save each plot as its own PNG file."
         )
@@ -0,0 +1,37 @@
+"""
+Microbenchmarks for the memory-compaction helpers that run after every agent step.
+
+Deselected by default (pytest.ini); -m benchmark selects them. Needs
+pytest-benchmark; the module is skipped without it. Save a baseline and fail
+on a >20% slowdown of the mean:
+
+    venv/bin/pytest tests/test_benchmarks.py -m benchmark --benchmark-autosave
+    venv/bin/pytest tests/test_benchmarks.py -m benchmark --benchmark-compare --benchmark-compare-fail=mean:20%
+"""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from src.memory.compact_memory import _DEFAULT_SUFFIX, truncate_text, truncate_tokens
+
+pytestmark = pytest.mark.benchmark
+
+# Built once; observations reaching the callback are a few KB of tool output
+LONG_TEXT = "x" * 10_000
+LONG_OBSERVATION = "word " * 2000
+
+
+def test_truncate_text_long(benchmark):
+    result = benchmark(truncate_text, LONG_TEXT, 800)
+    assert len(result) == 800
+
+
+def test_truncate_text_short(benchmark):
+    # The common case: nothing to cut, the input is returned as is
+    result = benchmark(truncate_text, "short", 800)
+    assert result == "short"
+
+
+def test_truncate_tokens_long(benchmark):
+    result = benchmark(truncate_tokens, LONG_OBSERVATION, 250)
+    assert result.endswith(_DEFAULT_SUFFIX)
@@ -0,0 +1,200 @@
+"""
+Unit tests for memory compaction and the response cache.
+Kept apart from test_tools.py so these run without importing Polars.
+"""
+import pytest
+
+from src.memory import compact_memory
+from src.memory.compact_memory import (
+    truncate_text,
+    truncate_tokens,
+    count_tokens,
+    compact_memory_callback,
+    MAX_OBSERVATION_TOKENS,
+    MAX_ERROR_OBSERVATION_TOKENS,
+    _DEFAULT_SUFFIX,
+)
+from src.memory import response_cache
+from src.memory.response_cache import ResponseCache
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+# Cache keys only need files to stat, so two small files stand in for datasets
+@pytest.fixture(scope="session")
+def data_csv(tmp_path_factory):
+    p = tmp_path_factory.mktemp("data") / "data.csv"
+    p.write_text("a,b\n1,2\n")
+    return str(p)
+
+
+@pytest.fixture(scope="session")
+def other_csv(tmp_path_factory):
+    p = tmp_path_factory.mktemp("data") / "other.csv"
+    p.write_text("a,b\n3,4\n5,6\n")
+    return str(p)
+
+
+# ---------------------------------------------------------------------------
+# Memory compaction
+# ---------------------------------------------------------------------------
+
+class TestTruncateText:
+    @pytest.mark.parametrize("text,limit,kwargs,expected", [
+        pytest.param("hello", 100, {}, "hello", id="short"),
+        pytest.param("x" * 100, 100, {}, "x" * 100, id="exact-limit"),
+        pytest.param("a" * 1000, 200, {}, "a" * (200 - len(_DEFAULT_SUFFIX)) + _DEFAULT_SUFFIX, id="long"),
+        pytest.param("a" * 50, 20, {"suffix": "[cut]"}, "a" * 15 + "[cut]", id="custom-suffix"),
+        pytest.param("a" * 50, 3, {"suffix": "[cut]"}, "[cu", id="limit-below-suffix"),
+    ])
+    def test_truncate_text(self, text, limit, kwargs, expected):
+        result = truncate_text(text, limit, **kwargs)
+        assert result == expected
+        assert len(result) <= limit
+
+
+class TestTruncateTokens:
+    def test_short_text_unchanged(self):
+        assert truncate_tokens("hello", 100) == "hello"
+
+    def test_long_text_within_budget(self):
+        result = truncate_tokens("word " * 1000, 50)
+        assert result.endswith(_DEFAULT_SUFFIX)
+        assert count_tokens(result) <= 50
+
+    def test_short_text_skips_encoder(self, monkeypatch):
+        def fail():
+            raise AssertionError("text within the byte budget was tokenized")
+        monkeypatch.setattr(compact_memory, "_get_encoder", fail)
+        assert truncate_tokens("hello", 5) == "hello"
+
+    def test_limit_below_suffix_stays_within_budget(self):
+        result = truncate_tokens("word " * 1000, 2)
+        assert count_tokens(result) <= 2
+
+    def test_chars_per_token_fallback(self, monkeypatch):
+        monkeypatch.setattr(compact_memory, "_get_encoder", lambda: None)
+        assert count_tokens("a" * 9) == 3
+        assert truncate_tokens("a" * 100, 10) == "a" * 25 + _DEFAULT_SUFFIX
+
+    def test_real_encoder_counts_tokens(self):
+        encoder = compact_memory._get_encoder()
+        if encoder is None:
+            pytest.skip("cl100k_base encoding unavailable")
+        # The chars/4 estimate would say 3
+        assert count_tokens("hello world") == 2
+        result = truncate_tokens("word " * 1000, 50)
+        assert len(encoder.encode(result)) <= 50
+
+
+class _FakeStep:
+    """Minimal stand-in for smolagents ActionStep."""
+    __slots__ = ("observations", "error")
+
+    def __init__(self, observations, error=None):
+        self.observations = observations
+        self.error = error
+
+
+_SHARED_STEP = _FakeStep(observations="")
+
+
+@pytest.fixture
+def step():
+    """One _FakeStep reused by every test, reset before each."""
+    _SHARED_STEP.observations = ""
+    _SHARED_STEP.error = None
+    return _SHARED_STEP
+
+
+class TestCompactMemoryCallback:
+    # Strings are immutable, so one payload serves every test
+    LONG_OBSERVATION = "word " * 2000
+
+    @pytest.mark.parametrize("error,min_tokens,max_tokens", [
+        pytest.param(None, 0, MAX_OBSERVATION_TOKENS, id="ok"),
+        # Errors get a higher limit so the traceback survives
+        pytest.param("boom", MAX_OBSERVATION_TOKENS, MAX_ERROR_OBSERVATION_TOKENS, id="error"),
+    ])
+    def test_truncates_long_observation(self, step, error, min_tokens, max_tokens):
+        step.observations = self.LONG_OBSERVATION
+        step.error = error
+        compact_memory_callback(step)
+        assert min_tokens < count_tokens(step.observations) <= max_tokens
+        assert step.observations.endswith(_DEFAULT_SUFFIX)
+
+    def test_short_observation_unchanged(self, step):
+        step.observations = "short"
+        compact_memory_callback(step)
+        assert step.observations == "short"
+
+    def test_no_observations_attr_no_crash(self):
+        class NoObs:
+            pass
+        # Should not raise
+        compact_memory_callback(NoObs())
+
+    def test_empty_observations_no_crash(self, step):
+        compact_memory_callback(step)  # no raise
+        assert step.observations == ""
+
+    def test_kwargs_accepted(self, step):
+        """Regression: callback must accept **kwargs (smolagents passes agent=)."""
+        step.observations = "hi"
+        compact_memory_callback(step, agent="fake_agent_object")
+        assert step.observations == "hi"
+
+
+# ---------------------------------------------------------------------------
+# Response cache
+# ---------------------------------------------------------------------------
+
+class TestResponseCache:
+    def test_miss_then_hit(self, tmp_path, data_csv):
+        cache = ResponseCache(str(tmp_path))
+        key = ResponseCache.make_key(data_csv, "task", "model")
+        assert cache.get(key) is None
+        cache.set(key, "answer")
+        assert cache.get(key) == "answer"
+
+    def test_persists_to_disk(self, tmp_path, data_csv):
+        key = ResponseCache.make_key(data_csv, "task", "model")
+        ResponseCache(str(tmp_path)).set(key, "answer")
+        # Fresh instance has an empty in-memory layer
+        assert ResponseCache(str(tmp_path)).get(key) == "answer"
+
+    def test_key_changes_with_task_model_and_file(self, other_csv, data_csv):
+        base = ResponseCache.make_key(data_csv, "task", "model")
+        assert ResponseCache.make_key(data_csv, "other", "model") != base
+        assert ResponseCache.make_key(data_csv, "task", "other") != base
+        assert ResponseCache.make_key(other_csv, "task", "model") != base
+
+    def test_key_changes_with_prompt_and_format(self, data_csv, monkeypatch):
+        base = ResponseCache.make_key(data_csv, "task", "model")
+        monkeypatch.setattr(response_cache, "AGENT_SYSTEM_PROMPT_SHA", "other")
+        assert ResponseCache.make_key(data_csv, "task", "model") != base
+        monkeypatch.undo()
+        monkeypatch.setattr(response_cache, "CACHE_FORMAT_VERSION", 0)
+        assert ResponseCache.make_key(data_csv, "task", "model") != base
+
+    def test_missing_visualization_is_a_miss(self, tmp_path, data_csv):
+        plot = tmp_path / "plot.png"
+        plot.write_bytes(b"")
+        answer = {"key_findings": ["x"], "visualizations": [str(plot)]}
+        cache = ResponseCache(str(tmp_path))
+        key = ResponseCache.make_key(data_csv, "task", "model")
+        cache.set(key, answer)
+        assert cache.get(key) == answer
+        plot.unlink()
+        assert cache.get(key) is None
+        assert ResponseCache(str(tmp_path)).get(key) is None
+
+    def test_unserializable_kept_in_memory(self, tmp_path, data_csv):
+        cache = ResponseCache(str(tmp_path))
+        key = ResponseCache.make_key(data_csv, "task", "model")
+        value = object()
+        cache.set(key, value)
+        assert cache.get(key) is value
+        assert ResponseCache(str(tmp_path)).get(key) is None
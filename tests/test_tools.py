@@ -1,110 +1,195 @@
 """
-Unit tests for all tools and memory compaction.
+Unit tests for the data tools, the system prompt and the final-answer contract.
 No API calls — runs fast, verifies exact output the agent sees.
+Memory compaction and the response cache are covered in test_memory.py.
 """
+import inspect
+import json
 import os
-import sys
-import tempfile
-import pytest
+import re
+import shutil
+from types import SimpleNamespace
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pytest
+from pydantic import ValidationError
 
 from src.tools.data_loader import PolarsDataLoaderTool
+from src.tools import data_inspector
 from src.tools.data_inspector import DataInspectorTool
 from src.tools.data_profiler import DataProfilerTool
+from src.tools import data_validator
 from src.tools.data_validator import DataValidatorTool
-from src.memory.compact_memory import truncate_text, compact_memory_callback
+from src.tools import _csv_cache
+from src.tools._csv_cache import NO_CACHE_ENV, PARQUET_SIDECAR_ENV, column_stats, scan_file
+from src.tools.final_answer_schema import check_final_answer
+from src.prompts import system_prompts
+from src.prompts.system_prompts import BATCH_TASK_TEMPLATE
 
 
 # ---------------------------------------------------------------------------
 # Fixtures
 # ---------------------------------------------------------------------------
 
-SALES_PATH = "examples/sample_datasets/sales_data.csv"
-CUSTOMER_PATH = "examples/sample_datasets/customer_data.csv"
-EMPLOYEE_PATH = "examples/sample_datasets/employee_data.csv"
+DATASETS_DIR = os.path.join(os.path.dirname(__file__), '..', 'examples', 'sample_datasets')
+SALES_PATH = os.path.join(DATASETS_DIR, "sales_data.csv")
+CUSTOMER_PATH = os.path.join(DATASETS_DIR, "customer_data.csv")
+EMPLOYEE_PATH = os.path.join(DATASETS_DIR, "employee_data.csv")
+
+DATASETS = {"sales": SALES_PATH, "customer": CUSTOMER_PATH, "employee": EMPLOYEE_PATH}
+# Checked once at import; fixtures handing out the datasets skip without them
+DATASETS_PRESENT = all(os.path.exists(path) for path in DATASETS.values())
+
 
+def _require_datasets():
+    if not DATASETS_PRESENT:
+        pytest.skip("sample datasets missing from examples/sample_datasets")
 
-@pytest.fixture
+
+# (dataset, rows) of each sample dataset, for table-driven tests; column
+# names come from the dataset_columns fixture
+DATASET_CASES = [
+    pytest.param("sales", 25, id="sales"),
+    pytest.param("customer", 25, id="customer"),
+    pytest.param("employee", 25, id="employee"),
+]
+
+
+# Session-scoped: the tools memoize scans and reports per file fingerprint,
+# so each sample CSV is parsed once per test session, not once per test
+@pytest.fixture(scope="session")
 def sales_csv():
+    _require_datasets()
     return SALES_PATH
 
 
-@pytest.fixture
-def customer_csv():
-    return CUSTOMER_PATH
+@pytest.fixture(scope="session")
+def dataset_columns():
+    """Column names of each sample dataset, from one header-only read per file."""
+    import polars as pl
+
+    _require_datasets()
+    return {dataset: pl.read_csv(path, n_rows=0).columns for dataset, path in DATASETS.items()}
+
+
+# Tools are stateless between calls, so each module builds them once
+@pytest.fixture(scope="module")
+def loader():
+    return PolarsDataLoaderTool()
+
+
+@pytest.fixture(scope="module")
+def inspector():
+    return DataInspectorTool()
+
+
+@pytest.fixture(scope="module")
+def profiler():
+    return DataProfilerTool()
+
 
+@pytest.fixture(scope="module")
+def validator():
+    return DataValidatorTool()
 
-@pytest.fixture
-def employee_csv():
-    return EMPLOYEE_PATH
 
+# Every tool's report on every sample dataset, keyed by (tool, dataset), so
+# the tests below are lookups rather than tool runs
+@pytest.fixture(scope="module")
+def outputs(loader, inspector, profiler, validator):
+    _require_datasets()
+    tools = {"loader": loader, "inspector": inspector, "profiler": profiler, "validator": validator}
+    return {
+        (tool_name, dataset): tool.forward(path)
+        for tool_name, tool in tools.items()
+        for dataset, path in DATASETS.items()
+    }
 
-@pytest.fixture
-def empty_csv(tmp_path):
+
+# Small edge-case CSVs are only read, so each is written once per session
+@pytest.fixture(scope="session")
+def empty_csv(tmp_path_factory):
     """CSV with headers only, no rows."""
-    p = tmp_path / "empty.csv"
+    p = tmp_path_factory.mktemp("data") / "empty.csv"
     p.write_text("a,b,c\n")
     return str(p)
 
 
-@pytest.fixture
-def semicolon_csv(tmp_path):
+@pytest.fixture(scope="session")
+def semicolon_csv(tmp_path_factory):
     """CSV using semicolon separator."""
-    p = tmp_path / "semi.csv"
+    p = tmp_path_factory.mktemp("data") / "semi.csv"
     p.write_text("x;y;z\n1;2;3\n4;5;6\n")
     return str(p)
 
 
-@pytest.fixture
-def all_nulls_csv(tmp_path):
+@pytest.fixture(scope="session")
+def all_nulls_csv(tmp_path_factory):
     """CSV where one column is entirely null."""
-    p = tmp_path / "nulls.csv"
+    p = tmp_path_factory.mktemp("data") / "nulls.csv"
     p.write_text("id,val\n1,\n2,\n3,\n")
     return str(p)
 
 
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+# The loader's "Shape: N rows, M columns" line, compiled once for every test
+_LOADER_SHAPE = re.compile(r"^Shape: (\d+) rows, (\d+) columns$", re.MULTILINE)
+
+
+def assert_shape(text, rows, cols):
+    """Assert the loader report states exactly rows x cols."""
+    match = _LOADER_SHAPE.search(text)
+    assert match, f"no shape line in: {text!r}"
+    assert (int(match.group(1)), int(match.group(2))) == (rows, cols)
+
+
+def assert_all_present(text, tokens):
+    """Assert every token occurs in text, scanning text once with one regex."""
+    # Longest first, so a token that prefixes another doesn't shadow it
+    pattern = re.compile("|".join(map(re.escape, sorted(tokens, key=len, reverse=True))))
+    found = set(pattern.findall(text))
+    # A token only seen inside a longer match (e.g. "sales" in "sales_amount")
+    # is still a substring, so re-check just those
+    missing = [token for token in tokens if token not in found and token not in text]
+    assert not missing, f"missing from output: {missing}"
+
+
 # ---------------------------------------------------------------------------
 # PolarsDataLoaderTool
 # ---------------------------------------------------------------------------
 
 class TestDataLoader:
-    def test_loads_sales(self, sales_csv):
-        result = PolarsDataLoaderTool().forward(sales_csv)
-        assert "25 rows" in result
-        assert "6 columns" in result
+    @pytest.mark.parametrize("dataset,rows", DATASET_CASES)
+    def test_loads(self, outputs, dataset_columns, dataset, rows):
+        columns = dataset_columns[dataset]
+        result = outputs[("loader", dataset)]
+        assert_shape(result, rows, len(columns))
         # Must include actual column names so agent can reference them
-        for col in ["date", "product", "region", "sales_amount", "units_sold", "customer_type"]:
-            assert col in result
-
-    def test_loads_customer(self, customer_csv):
-        result = PolarsDataLoaderTool().forward(customer_csv)
-        assert "25 rows" in result
-        assert "7 columns" in result
-
-    def test_loads_employee(self, employee_csv):
-        result = PolarsDataLoaderTool().forward(employee_csv)
-        assert "25 rows" in result
-        assert "7 columns" in result
-
-    def test_missing_file_returns_error(self):
-        result = PolarsDataLoaderTool().forward("/no/such/file.csv")
-        assert "ERROR" in result
-        assert "not found" in result.lower()
-
-    def test_empty_csv(self, empty_csv):
-        result = PolarsDataLoaderTool().forward(empty_csv)
+        assert_all_present(result, columns)
+
+    def test_empty_csv(self, loader, empty_csv):
+        result = loader.forward(empty_csv)
         # Should not crash; 0 rows is valid
-        assert "0 rows" in result
+        assert_shape(result, 0, 3)
 
-    def test_semicolon_csv(self, semicolon_csv):
+    def test_semicolon_csv(self, loader, semicolon_csv):
         # Loader detects single-column result and retries with alternative separators
-        result = PolarsDataLoaderTool().forward(semicolon_csv)
+        result = loader.forward(semicolon_csv)
         assert "ERROR" not in result
-        assert "3 columns" in result
+        assert_shape(result, 2, 3)
 
-    def test_output_contains_null_counts(self, sales_csv):
-        result = PolarsDataLoaderTool().forward(sales_csv)
+    def test_latin1_tab_csv(self, loader, tmp_path):
+        # Non-UTF-8 bytes and a tab separator are both resolved by sniffing
+        p = tmp_path / "latin1.csv"
+        p.write_bytes("name\tcity\tscore\nJosé\tMálaga\t1\nRenée\tNîmes\t2\n".encode("latin-1"))
+        result = loader.forward(str(p))
+        assert "ERROR" not in result
+        assert_shape(result, 2, 3)
+
+    def test_output_contains_null_counts(self, outputs):
+        result = outputs[("loader", "sales")]
         # sales_data has 2 nulls in sales_amount — null counts list must appear
         assert "Nulls:" in result
 
@@ -114,52 +199,64 @@ class TestDataLoader:
 # ---------------------------------------------------------------------------
 
 class TestDataInspector:
-    def test_sales_schema(self, sales_csv):
-        result = DataInspectorTool().forward(sales_csv)
-        assert "25 rows" in result
-        assert "6 columns" in result
+    @pytest.mark.parametrize("dataset,rows", DATASET_CASES)
+    def test_schema(self, outputs, dataset_columns, dataset, rows):
+        columns = dataset_columns[dataset]
+        result = json.loads(outputs[("inspector", dataset)])
+        assert result["shape"] == [rows, len(columns)]
         # Every column must be named
-        for col in ["date", "product", "region", "sales_amount", "units_sold", "customer_type"]:
-            assert col in result
+        assert result["columns"] == columns
 
-    def test_customer_numeric_classification(self, customer_csv):
-        result = DataInspectorTool().forward(customer_csv)
+    def test_customer_numeric_classification(self, outputs):
+        result = json.loads(outputs[("inspector", "customer")])
+        kinds = dict(zip(result["columns"], result["kinds"]))
         # These are Int64/Float64 — must be labeled NUMERIC
         for col in ["age", "income", "purchase_frequency", "satisfaction_score"]:
-            assert col in result
-        assert "NUMERIC" in result
+            assert kinds[col] == "NUMERIC"
 
-    def test_customer_categorical_classification(self, customer_csv):
-        result = DataInspectorTool().forward(customer_csv)
+    def test_customer_categorical_classification(self, outputs):
+        result = json.loads(outputs[("inspector", "customer")])
+        kinds = dict(zip(result["columns"], result["kinds"]))
         # gender and membership_level are low-cardinality strings
-        assert "CATEGORICAL" in result
-        assert "gender" in result
-        assert "membership_level" in result
+        assert kinds["gender"] == "CATEGORICAL"
+        assert kinds["membership_level"] == "CATEGORICAL"
 
-    def test_detects_nulls_sales(self, sales_csv):
-        result = DataInspectorTool().forward(sales_csv)
+    def test_detects_nulls_sales(self, outputs):
+        result = json.loads(outputs[("inspector", "sales")])
+        nulls = dict(zip(result["columns"], result["nulls"]))
         # 2 nulls in sales_amount
-        assert "sales_amount" in result
-        assert "nulls=" in result  # each line has nulls=N
+        assert nulls["sales_amount"] == 2
+        assert any(w.startswith("sales_amount") for w in result["warnings"])
 
-    def test_detects_nulls_customer(self, customer_csv):
-        result = DataInspectorTool().forward(customer_csv)
+    def test_detects_nulls_customer(self, outputs):
+        result = json.loads(outputs[("inspector", "customer")])
+        nulls = dict(zip(result["columns"], result["nulls"]))
         # income: 1 null, purchase_frequency: 1 null
-        assert "income" in result
-        assert "purchase_frequency" in result
+        assert nulls["income"] == 1
+        assert nulls["purchase_frequency"] == 1
 
-    def test_employee_no_nulls(self, employee_csv):
-        result = DataInspectorTool().forward(employee_csv)
+    def test_employee_no_nulls(self, outputs):
+        result = json.loads(outputs[("inspector", "employee")])
         # employee_data has zero nulls
-        assert "No nulls" in result
-
-    def test_missing_file(self):
-        result = DataInspectorTool().forward("/no/such/file.csv")
-        assert "ERROR" in result
-
-    def test_empty_csv(self, empty_csv):
-        result = DataInspectorTool().forward(empty_csv)
-        assert "0 rows" in result
+        assert result["warnings"] == []
+        assert result["estimated"] is False
+
+    def test_empty_csv(self, inspector, empty_csv):
+        result = json.loads(inspector.forward(empty_csv))
+        assert result["shape"] == [0, 3]
+
+    def test_large_file_sampled(self, inspector, sales_csv, tmp_path, monkeypatch):
+        # Treat every file as large and count uniques over 10 of the 25 rows;
+        # a fresh copy keeps the cached full-file stats of sales_csv out of it
+        monkeypatch.setattr(_csv_cache, "_SAMPLE_UNIQUES_BYTES", 0)
+        monkeypatch.setattr(_csv_cache, "SAMPLE_ROWS", 10)
+        monkeypatch.setattr(data_inspector, "SAMPLE_ROWS", 10)
+        copy = shutil.copy(sales_csv, tmp_path)
+        result = json.loads(inspector.forward(copy))
+        assert result["estimated"] is True
+        # Rows and nulls still cover the whole file, matching the validator
+        assert result["shape"] == [25, 6]
+        assert dict(zip(result["columns"], result["nulls"]))["sales_amount"] == 2
 
 
 # ---------------------------------------------------------------------------
@@ -167,140 +264,389 @@ class TestDataInspector:
 # ---------------------------------------------------------------------------
 
 class TestDataProfiler:
-    def test_sales_profiling(self, sales_csv):
-        result = DataProfilerTool().forward(sales_csv)
+    def test_sales_profiling(self, outputs):
+        result = outputs[("profiler", "sales")]
         assert "PROFILING REPORT" in result
         # sales_amount and units_sold are numeric — ranges must appear
         assert "sales_amount" in result or "units_sold" in result
 
-    def test_customer_correlations(self, customer_csv):
-        result = DataProfilerTool().forward(customer_csv)
+    def test_customer_correlations(self, outputs):
+        result = outputs[("profiler", "customer")]
         # age vs income likely correlates > 0.5 in this dataset
         assert "Correlations" in result
 
-    def test_customer_categorical_top_values(self, customer_csv):
-        result = DataProfilerTool().forward(customer_csv)
+    def test_customer_ranges_capped(self, outputs):
+        result = outputs[("profiler", "customer")]
+        ranges = result.split("Numeric ranges:\n")[1].split("\n\n")[0].splitlines()
+        # customer has more numeric columns; the report sent in every prompt lists 3
+        assert len(ranges) == 3
+        # purchase_frequency is the 5th numeric column
+        assert "purchase_frequency: [" not in result
+
+    def test_customer_categorical_top_values(self, outputs):
+        result = outputs[("profiler", "customer")]
         # gender and membership_level are low-cardinality strings
         assert "Categorical" in result
 
-    def test_employee_profiling(self, employee_csv):
-        result = DataProfilerTool().forward(employee_csv)
-        assert "PROFILING REPORT" in result
-        assert "salary" in result
+    def test_top_values_ordered_by_frequency(self, profiler, tmp_path):
+        p = tmp_path / "cats.csv"
+        values = ["b"] * 3 + ["a"] * 5 + ["c"]
+        p.write_text("label\n" + "\n".join(values) + "\n")
+        result = profiler.forward(str(p))
+        assert "  label: a, b, c" in result
 
-    def test_missing_file(self):
-        result = DataProfilerTool().forward("/no/such/file.csv")
-        assert "ERROR" in result
+    def test_employee_profiling(self, outputs):
+        result = outputs[("profiler", "employee")]
+        assert_all_present(result, ["PROFILING REPORT", "salary"])
 
-    def test_single_numeric_col_no_crash(self, tmp_path):
+    def test_single_numeric_col_no_crash(self, profiler, tmp_path):
         """Only one numeric col — correlation block should not crash."""
         p = tmp_path / "single.csv"
         p.write_text("name,score\nAlice,90\nBob,80\n")
-        result = DataProfilerTool().forward(str(p))
+        result = profiler.forward(str(p))
         assert "ERROR" not in result
 
+    def test_decimal_columns_profiled(self, profiler, tmp_path, monkeypatch):
+        """Decimal columns get ranges and correlations instead of failing pl.corr."""
+        from decimal import Decimal
+        import polars as pl
+
+        # CSV inference never yields Decimal, so the typed frame comes from a Parquet sidecar
+        monkeypatch.setenv(PARQUET_SIDECAR_ENV, "1")
+        p = tmp_path / "prices.csv"
+        frame = pl.DataFrame(
+            {
+                "price": [Decimal(f"{i}.25") for i in range(20)],
+                "cost": [Decimal(f"{2 * i}.50") if i % 5 else None for i in range(20)],
+            },
+            schema={"price": pl.Decimal(10, 2), "cost": pl.Decimal(10, 2)},
+        )
+        frame.write_csv(p)
+        frame.write_parquet(tmp_path / "prices.parquet")
+        assert isinstance(scan_file(str(p)).collect_schema()["price"], pl.Decimal)
+        result = profiler.forward(str(p))
+        assert "ERROR" not in result
+        assert "price: [0.25, 19.25], outliers=0" in result
+        assert "price <-> cost: 1.000" in result
+
+    def test_correlation_ignores_nulls_pairwise(self, profiler, tmp_path):
+        """A null in one column must not hide that column's correlations."""
+        p = tmp_path / "corr.csv"
+        p.write_text("x,y,z\n1,2,5\n2,4,3\n3,,2\n4,8,2\n5,10,1\n")
+        result = profiler.forward(str(p))
+        assert_all_present(result, ["x <-> y: 1.000", "x <-> z"])
+
+    def test_constant_column_has_no_correlation(self, profiler, tmp_path):
+        """pl.corr of a constant column is NaN, which must not be reported."""
+        p = tmp_path / "constant.csv"
+        p.write_text("x,y,k\n1,2,7\n2,4,7\n3,7,7\n")
+        result = profiler.forward(str(p))
+        assert "x <-> y" in result
+        assert "<-> k" not in result
+
+    def test_numeric_range_and_outliers(self, profiler, tmp_path):
+        """Range and IQR outlier count come from one batched select."""
+        p = tmp_path / "outliers.csv"
+        p.write_text("score\n" + "\n".join(str(v) for v in [*range(1, 11), 100]) + "\n")
+        result = profiler.forward(str(p))
+        assert "score: [1, 100], outliers=1" in result
+
+    def test_nulls_not_counted_as_outliers(self, profiler, tmp_path):
+        p = tmp_path / "outliers_nulls.csv"
+        p.write_text("score\n" + "\n".join([*map(str, range(1, 11)), "", "", "100"]) + "\n")
+        result = profiler.forward(str(p))
+        assert "score: [1, 100], outliers=1" in result
+
+    def test_sparse_column_skipped_from_correlations(self, profiler, tmp_path):
+        """A column with a single value gets a range but no correlation pairs."""
+        p = tmp_path / "sparse.csv"
+        p.write_text("a,b\n1,\n2,7\n3,\n")
+        result = profiler.forward(str(p))
+        assert "b: [7, 7], outliers=0" in result
+        assert "None found" in result
+
 
 # ---------------------------------------------------------------------------
 # DataValidatorTool
 # ---------------------------------------------------------------------------
 
 class TestDataValidator:
-    def test_sales_nulls_reported(self, sales_csv):
-        result = DataValidatorTool().forward(sales_csv)
-        assert "QUALITY REPORT" in result
-        assert "sales_amount" in result
-        assert "Nulls detected" in result
-
-    def test_employee_clean(self, employee_csv):
-        result = DataValidatorTool().forward(employee_csv)
+    def test_sales_nulls_reported(self, outputs):
+        result = outputs[("validator", "sales")]
+        assert_all_present(result, ["QUALITY REPORT", "sales_amount", "Nulls detected"])
+
+    def test_employee_clean(self, outputs):
+        result = outputs[("validator", "employee")]
         assert "No nulls" in result
 
-    def test_customer_null_cols(self, customer_csv):
-        result = DataValidatorTool().forward(customer_csv)
-        assert "income" in result
-        assert "purchase_frequency" in result
+    def test_customer_null_cols(self, outputs):
+        result = outputs[("validator", "customer")]
+        assert_all_present(result, ["income", "purchase_frequency"])
 
-    def test_fix_options_present(self, sales_csv):
-        result = DataValidatorTool().forward(sales_csv)
+    def test_fix_options_present(self, outputs):
+        result = outputs[("validator", "sales")]
         # Should suggest drop_nulls or fill_null
         assert "drop_nulls" in result or "fill_null" in result
 
-    def test_column_type_labels(self, customer_csv):
-        result = DataValidatorTool().forward(customer_csv)
-        assert "NUMERIC" in result
-        assert "CATEGORICAL" in result
+    def test_fill_hint_matches_dtype(self, validator, tmp_path):
+        p = tmp_path / "fill.csv"
+        p.write_text("amount,label\n1.5,a\n,\n2.5,b\n")
+        result = validator.forward(str(p))
+        assert_all_present(result, ["pl.col('amount').fill_null(0)", "pl.col('label').fill_null('Unknown')"])
+
+    def test_column_type_labels(self, outputs):
+        result = outputs[("validator", "customer")]
+        assert_all_present(result, ["NUMERIC", "CATEGORICAL"])
 
-    def test_all_nulls_column(self, all_nulls_csv):
-        result = DataValidatorTool().forward(all_nulls_csv)
+    def test_all_nulls_column(self, validator, all_nulls_csv):
+        result = validator.forward(all_nulls_csv)
         assert "val" in result
         # 3 nulls out of 3 rows = 100%
         assert "100.0%" in result
 
-    def test_missing_file(self):
-        result = DataValidatorTool().forward("/no/such/file.csv")
-        assert "ERROR" in result
+    def test_large_file_labels_sampled_types(self, validator, tmp_path, monkeypatch):
+        monkeypatch.setattr(_csv_cache, "_SAMPLE_UNIQUES_BYTES", 0)
+        p = tmp_path / "big.csv"
+        p.write_text("a,b\n1,x\n,y\n")
+        result = validator.forward(str(p))
+        assert_all_present(result, [
+            "Column types (sampled: first 100k rows):",
+            "a: 1 (50.0%)",
+            "b: String (CATEGORICAL)",
+        ])
+
+    def test_single_definition(self):
+        source = inspect.getsource(data_validator)
+        assert source.count("class DataValidatorTool") == 1
+        assert data_validator.__all__ == ['DataValidatorTool']
+
+
+# ---------------------------------------------------------------------------
+# All tools
+# ---------------------------------------------------------------------------
+
+MISSING_PATH = "/no/such/file.csv"
+
+
+class TestMissingFile:
+    @pytest.mark.parametrize("tool_name,message", [
+        ("loader", "File not found"),
+        ("inspector", "Failed to inspect data"),
+        ("profiler", "Failed to profile data"),
+        ("validator", "Validation failed"),
+    ])
+    def test_missing_file_returns_error(self, request, tool_name, message):
+        result = request.getfixturevalue(tool_name).forward(MISSING_PATH)
+        assert result.startswith(f"ERROR: {message}")
+        assert MISSING_PATH in result
+
+
+# ---------------------------------------------------------------------------
+# Shared CSV caches
+# ---------------------------------------------------------------------------
+
+class TestReportCache:
+    def test_column_stats_shared(self, sales_csv):
+        stats = column_stats(sales_csv)
+        assert column_stats(sales_csv) is stats
+        assert stats.n_rows == 25
+        assert stats.null_counts["sales_amount"] == 2
+        # Cardinality is only tracked for non-numeric columns
+        assert "sales_amount" not in stats.unique_counts
+
+    def test_column_stats_refreshed_on_change(self, tmp_path):
+        p = tmp_path / "data.csv"
+        p.write_text("a,b\n1,x\n")
+        first = column_stats(str(p))
+        p.write_text("a,b\n1,x\n2,y\n")
+        assert column_stats(str(p)).n_rows == 2
+        assert first.n_rows == 1
+
+    def test_low_cardinality_counts_are_exact(self, tmp_path):
+        p = tmp_path / "data.csv"
+        rows = [f"c{i % 19},t{i}" for i in range(200)]
+        p.write_text("cat,text\n" + "\n".join(rows) + "\n")
+        stats = column_stats(str(p))
+        assert stats.unique_counts["cat"] == 19
+        assert stats.unique_counts["text"] > 32
+
+    def test_wide_file_stats_merged_across_chunks(self, inspector, tmp_path):
+        p = tmp_path / "wide.csv"
+        header = [f"n{i}" for i in range(100)] + [f"s{i}" for i in range(50)]
+        row = [str(i) for i in range(100)] + ["x"] * 49 + [""]
+        p.write_text(",".join(header) + "\n" + ",".join(row) + "\n" + ",".join(row) + "\n")
+        stats = column_stats(str(p))
+        assert len(stats.null_counts) == 150
+        assert stats.null_counts["s49"] == 2
+        assert stats.unique_counts["s0"] == 1
+        result = json.loads(inspector.forward(str(p)))
+        assert result["shape"] == [2, 150]
+        assert result["nulls"][-1] == 2
+
+    def test_report_quotes_callers_path(self, loader, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data.csv").write_text("a,b\n1,x\n")
+        assert loader.forward("data.csv").startswith("CSV loaded: data.csv\n")
+        # Same file and fingerprint, but the report names the path given
+        absolute = str(tmp_path / "data.csv")
+        assert loader.forward(absolute).startswith(f"CSV loaded: {absolute}\n")
+
+    def test_parquet_sidecar_ignored_by_default(self, tmp_path, monkeypatch):
+        import polars as pl
+
+        monkeypatch.delenv(PARQUET_SIDECAR_ENV, raising=False)
+        p = tmp_path / "data.csv"
+        p.write_text("a,b\n1,x\n2,y\n")
+        pl.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}).write_parquet(tmp_path / "data.parquet")
+        # The user asked about the CSV; a sibling .parquet is only read on opt-in
+        assert column_stats(str(p)).n_rows == 2
+
+    def test_parquet_sidecar_opt_in(self, tmp_path, monkeypatch):
+        import polars as pl
+
+        monkeypatch.setenv(PARQUET_SIDECAR_ENV, "1")
+        p = tmp_path / "data.csv"
+        p.write_text("a,b\n1,x\n2,y\n")
+        pl.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}).write_parquet(tmp_path / "data.parquet")
+        # The sidecar is newer than the CSV, so it is the one scanned
+        assert column_stats(str(p)).n_rows == 3
+
+    def test_stale_parquet_sidecar_ignored(self, tmp_path, monkeypatch):
+        import polars as pl
+
+        monkeypatch.setenv(PARQUET_SIDECAR_ENV, "1")
+        p = tmp_path / "data.csv"
+        sidecar = tmp_path / "data.parquet"
+        pl.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}).write_parquet(sidecar)
+        p.write_text("a,b\n1,x\n2,y\n")
+        os.utime(sidecar, ns=(0, 0))
+        assert column_stats(str(p)).n_rows == 2
+
+    def test_parquet_sidecar_with_other_columns_ignored(self, tmp_path, monkeypatch):
+        import polars as pl
+
+        monkeypatch.setenv(PARQUET_SIDECAR_ENV, "1")
+        p = tmp_path / "data.csv"
+        p.write_text("a,b\n1,x\n2,y\n")
+        pl.DataFrame({"a": [1, 2, 3]}).write_parquet(tmp_path / "data.parquet")
+        assert column_stats(str(p)).n_rows == 2
+
+    def test_parquet_sidecar_reports_match_csv(self, inspector, validator, sales_csv, tmp_path, monkeypatch):
+        import polars as pl
+
+        csv_path = tmp_path / "sales_data.csv"
+        shutil.copyfile(sales_csv, csv_path)
+        pl.read_csv(csv_path, ignore_errors=True).write_parquet(tmp_path / "sales_data.parquet")
+        expected = inspector.forward(str(csv_path)), validator.forward(str(csv_path))
+        monkeypatch.setenv(PARQUET_SIDECAR_ENV, "1")
+        assert (inspector.forward(str(csv_path)), validator.forward(str(csv_path))) == expected
+
+    def test_modified_file_is_reprofiled(self, profiler, tmp_path):
+        p = tmp_path / "data.csv"
+        p.write_text("a,b\n1,2\n5,6\n")
+        first = profiler.forward(str(p))
+        p.write_text("a,b\n1,2\n3,4\n9,9\n")
+        assert profiler.forward(str(p)) != first
+
+    def test_report_memoized_per_file(self, profiler, sales_csv):
+        first = profiler.forward(sales_csv)
+        assert profiler.forward(sales_csv) is first
+
+    def test_loader_and_validator_reports_memoized(self, loader, validator, sales_csv):
+        assert loader.forward(sales_csv) is loader.forward(sales_csv)
+        assert validator.forward(sales_csv) is validator.forward(sales_csv)
+
+    def test_no_cache_env_bypasses_report_cache(self, profiler, sales_csv, monkeypatch):
+        first = profiler.forward(sales_csv)
+        monkeypatch.setenv(NO_CACHE_ENV, "1")
+        second = profiler.forward(sales_csv)
+        assert second is not first
+        assert "PROFILING REPORT" in second
+
+    def test_tools_share_one_scan(self, inspector, profiler, validator, tmp_path, monkeypatch):
+        import polars as pl
+
+        p = tmp_path / "data.csv"
+        p.write_text("a,b,c\n1,x,2.5\n2,y,\n3,x,4.0\n")
+        calls = []
+        real_scan_csv = pl.scan_csv
+
+        def counting_scan_csv(*args, **kwargs):
+            calls.append(args)
+            return real_scan_csv(*args, **kwargs)
+
+        monkeypatch.setattr(pl, "scan_csv", counting_scan_csv)
+        inspector.forward(str(p))
+        profiler.forward(str(p))
+        validator.forward(str(p))
+        assert len(calls) == 1
+
+
+# ---------------------------------------------------------------------------
+# System prompt
+# ---------------------------------------------------------------------------
+
+class TestSystemPrompt:
+    def test_single_definition(self):
+        assert system_prompts.AGENT_SYSTEM_PROMPT.count("MANDATORY WORKFLOW") == 1
+
+    def test_blocks_reassemble_prompt(self):
+        blocks = system_prompts.system_blocks()
+        assert "".join(b["text"] for b in blocks) == system_prompts.AGENT_SYSTEM_PROMPT
+        assert all("cache_control" in b for b in blocks)
+
+    def test_prompt_bytes_normalized(self):
+        prompt = system_prompts.AGENT_SYSTEM_PROMPT
+        assert all(line == line.rstrip() for line in prompt.split("\n"))
+        assert prompt.endswith("\n") and not prompt.endswith("\n\n")
+
+    def test_prompt_hash_pinned(self):
+        # Any prompt edit invalidates provider prompt caches; update this
+        # hash deliberately when changing the prompt
+        assert system_prompts.AGENT_SYSTEM_PROMPT_SHA == (
+            "ceb9a2f393ed96d39c364d9f16f21aa1eeb65ded64a784e317532619a4530faa"
+        )
 
 
 # ---------------------------------------------------------------------------
-# Memory compaction
+# Final answer contract
 # ---------------------------------------------------------------------------
 
-class TestTruncateText:
-    def test_short_text_unchanged(self):
-        assert truncate_text("hello", 100) == "hello"
-
-    def test_exact_limit_unchanged(self):
-        text = "x" * 100
-        assert truncate_text(text, 100) == text
-
-    def test_long_text_truncated(self):
-        text = "a" * 1000
-        result = truncate_text(text, 200)
-        assert len(result) == 200
-        assert result.endswith("... [truncated]")
-
-    def test_custom_suffix(self):
-        result = truncate_text("a" * 50, 20, suffix="[cut]")
-        assert result.endswith("[cut]")
-        assert len(result) == 20
-
-
-class _FakeStep:
-    """Minimal stand-in for smolagents ActionStep."""
-    def __init__(self, observations, error=None):
-        self.observations = observations
-        self.error = error
-
-
-class TestCompactMemoryCallback:
-    def test_truncates_long_observation(self):
-        step = _FakeStep(observations="x" * 2000)
-        compact_memory_callback(step)
-        assert len(step.observations) == 800
-        assert step.observations.endswith("... [truncated]")
-
-    def test_short_observation_unchanged(self):
-        step = _FakeStep(observations="short")
-        compact_memory_callback(step)
-        assert step.observations == "short"
-
-    def test_error_gets_higher_limit(self):
-        step = _FakeStep(observations="e" * 2000, error="boom")
-        compact_memory_callback(step)
-        assert len(step.observations) == 1200
-
-    def test_no_observations_attr_no_crash(self):
-        class NoObs:
-            pass
-        # Should not raise
-        compact_memory_callback(NoObs())
-
-    def test_empty_observations_no_crash(self):
-        step = _FakeStep(observations="")
-        compact_memory_callback(step)  # no raise
-
-    def test_kwargs_accepted(self):
-        """Regression: callback must accept **kwargs (smolagents passes agent=)."""
-        step = _FakeStep(observations="hi")
-        compact_memory_callback(step, agent="fake_agent_object")
-        assert step.observations == "hi"
+class TestFinalAnswerCheck:
+    def test_valid_dict_accepted(self):
+        answer = {"key_findings": ["North leads sales"], "visualizations": ["sales.png"]}
+        assert check_final_answer(answer, None)
+
+    def test_dict_without_findings_rejected(self):
+        with pytest.raises(ValidationError):
+            check_final_answer({"visualizations": ["sales.png"]}, None)
+
+    def test_too_many_findings_rejected(self):
+        with pytest.raises(ValidationError):
+            check_final_answer({"key_findings": ["x"] * 6}, None)
+
+    def test_malformed_dict_rejected(self):
+        with pytest.raises(ValidationError):
+            check_final_answer({"key_findings": "North leads", "visualizations": "sales.png"}, None)
+
+    def test_free_text_rejected(self):
+        with pytest.raises(ValueError, match="key_findings"):
+            check_final_answer("North leads sales", None)
+
+    @pytest.mark.parametrize("text", [
+        '{"key_findings": ["North leads sales"]}',
+        "{'key_findings': ['North leads sales'], 'visualizations': []}",
+    ], ids=["json", "dict-literal"])
+    def test_dict_string_validated(self, text):
+        assert check_final_answer(text, None)
+        with pytest.raises(ValidationError):
+            check_final_answer(text.replace("key_findings", "findings"), None)
+
+    def test_malformed_dict_string_rejected(self):
+        with pytest.raises(ValueError):
+            check_final_answer("{'key_findings': ['North leads'", None)
+
+    def test_batch_run_accepts_text_unless_blank(self):
+        batch_agent = SimpleNamespace(task=BATCH_TASK_TEMPLATE.format(n_tasks=1, tasks="## Task 1\nx"))
+        assert check_final_answer("## Task 1\nok", None, agent=batch_agent)
+        assert not check_final_answer("   ", None, agent=batch_agent)